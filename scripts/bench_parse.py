@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+for p in (SRC, ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from dlsite_app.config import settings
+from dlsite_app.services.scraper import parse_static_page
+
+
+def cached_product_pages() -> list[Path]:
+    """Bodies of product pages in the HTTP cache (``cache_dir/http``)."""
+    pages = []
+    for meta_path in sorted((settings.cache_dir / "http").glob("*/*.json")):
+        if meta_path.name.endswith(".parsed.json"):
+            continue
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if "/work/=/product_id/" in meta.get("url", ""):
+            body = meta_path.with_suffix(".body")
+            if body.exists():
+                pages.append(body)
+    return pages
+
+
+def main(paths: list[str], repeat: int = 5):
+    """Time parse_static_page() on stored product pages (no network access)."""
+    files = [Path(p) for p in paths] or cached_product_pages()
+    if not files:
+        print(f"No product pages given and none cached under {settings.cache_dir / 'http'}")
+        return
+    bodies = [f.read_bytes() for f in files]
+    total_bytes = sum(len(b) for b in bodies)
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in bodies:
+            parse_static_page(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    per_page = best / len(bodies)
+    print(f"{len(bodies)} page(s), {total_bytes / 1024:.0f} KiB, best of {repeat} run(s)")
+    print(f"{best:.3f}s total, {per_page * 1000:.2f} ms/page, {len(bodies) / best:.1f} pages/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the product page parser")
+    parser.add_argument("pages", nargs="*", help="saved HTML files (default: product pages in the HTTP cache)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs; the fastest is reported")
+    args = parser.parse_args()
+    main(args.pages, repeat=args.repeat)
@@ -0,0 +1,159 @@
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+for p in (SRC, ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+# The stub is local: measure our own throughput, not the politeness budgets
+# (read when the rate limiter is built at import; set them explicitly to override)
+for _name in ("RATE_LIMIT_DLSITE", "RATE_LIMIT_CHOBIT", "RATE_LIMIT_IMAGES"):
+    os.environ.setdefault(_name, "0")
+
+from dlsite_app.config import settings
+from dlsite_app.services import http_client, replay, scraper
+from dlsite_app.services.ingest import ingest_json_files
+
+
+STAGES = ("fetch_static_data", "fetch_dynamic_data", "save_work_to_json")
+
+
+class StageTimer:
+    """Wraps scraper functions in place and collects per-call wall times."""
+
+    def __init__(self, module, names):
+        self.module = module
+        self.names = names
+        self.samples: dict[str, list[float]] = {name: [] for name in names}
+        self._originals = {}
+        self._lock = threading.Lock()
+
+    def _wrap(self, name, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples[name].append(elapsed)
+
+        return timed
+
+    def __enter__(self):
+        for name in self.names:
+            self._originals[name] = getattr(self.module, name)
+            setattr(self.module, name, self._wrap(name, self._originals[name]))
+        return self
+
+    def __exit__(self, *exc):
+        for name, func in self._originals.items():
+            setattr(self.module, name, func)
+
+
+def _summary(name: str, samples: list[float]) -> str:
+    if not samples:
+        return f"  {name:<20} (not called)"
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (
+        f"  {name:<20} {len(samples):>5} call(s)  total {sum(samples):8.3f}s  "
+        f"mean {statistics.fmean(samples) * 1000:8.2f} ms  p50 {statistics.median(samples) * 1000:8.2f} ms  "
+        f"p95 {p95 * 1000:8.2f} ms"
+    )
+
+
+def run(codes: list[str], workers: int, images: bool, cache_mode: str, verbose: bool) -> dict:
+    """One scrape + ingest pass against the stub, in a scratch data directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        settings.raw_data_dir = tmp / "raw"
+        settings.cache_dir = tmp / "cache"
+        settings.image_root = tmp / "images"
+        settings.db_path = tmp / "asmr.db"
+        settings.http_cache_mode = cache_mode
+        settings.scrape_sink = "json"
+        http_client.close_sessions()  # fresh connection pools sized for ``workers``
+        settings.scrape_concurrency = workers
+
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with StageTimer(scraper, STAGES) as timer, output:
+            start = time.perf_counter()
+            results = scraper.scrape_many(codes, workers=workers, download_media=images)
+            scrape_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            report = ingest_json_files()
+            ingest_time = time.perf_counter() - start
+
+    return {
+        "workers": workers,
+        "ok": sum(1 for success in results.values() if success),
+        "scrape_time": scrape_time,
+        "ingest_time": ingest_time,
+        "ingested": report["ingested"],
+        "samples": timer.samples,
+    }
+
+
+def main(
+    name: str,
+    codes: list[str],
+    workers_list: list[int],
+    images: bool = False,
+    cache_mode: str = "off",
+    verbose: bool = False,
+):
+    """Benchmark scrape -> ingest offline against a recording (see scripts/replay.py)."""
+    recording = replay.Recording(name)
+    codes = codes or recording.product_codes()
+    if not codes:
+        print(f"No product pages recorded in {recording.root}; run scripts/replay.py record/import-cache first.")
+        return
+
+    server = replay.ReplayServer(recording).start()
+    settings.http_replay_url = server.url
+    settings.http_record = ""
+    try:
+        print(f"{len(codes)} work(s) from {recording.root}, stub at {server.url}, page cache: {cache_mode}")
+        for workers in workers_list:
+            result = run(codes, workers, images, cache_mode, verbose)
+            print(
+                f"\nworkers={workers}: {result['ok']}/{len(codes)} scraped in {result['scrape_time']:.3f}s "
+                f"({result['ok'] / result['scrape_time']:.1f} works/s)"
+            )
+            for stage in STAGES:
+                print(_summary(stage, result["samples"][stage]))
+            print(
+                f"  {'ingest_json_files':<20} {result['ingested']:>5} work(s)   total {result['ingest_time']:8.3f}s  "
+                f"({result['ingested'] / result['ingest_time']:.1f} works/s)"
+            )
+    finally:
+        server.stop()
+    print(f"\nStub requests: {server.stats}")
+    if server.stats["miss"]:
+        print("Some requests were not in the recording (404); their stages ran on partial data.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline scrape/ingest benchmark against a recorded replay")
+    parser.add_argument("rj_codes", nargs="*", help="works to scrape (default: every recorded product page)")
+    parser.add_argument("--name", default="default", help="recording name under CACHE_DIR/replay")
+    parser.add_argument("--workers", type=int, nargs="+", default=[settings.scrape_concurrency],
+                        help="scrape concurrency; several values are benchmarked one after another")
+    parser.add_argument("--images", action="store_true", help="also download images (from the stub)")
+    parser.add_argument("--cache-mode", default="off", choices=["off", "revalidate"],
+                        help="raw page cache during the run (a fresh, empty cache per run)")
+    parser.add_argument("--verbose", action="store_true", help="show scraper output")
+    args = parser.parse_args()
+    main(args.name, args.rj_codes, args.workers, images=args.images, cache_mode=args.cache_mode, verbose=args.verbose)
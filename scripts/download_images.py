@@ -0,0 +1,56 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+for p in (SRC, ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from dlsite_app.config import settings
+from dlsite_app.db import bump_catalog_version, get_db_connection
+from dlsite_app.services.documents import refresh_work_docs
+from dlsite_app.services import thumbnails
+from dlsite_app.services.scraper import download_images
+
+
+def main(rj_codes: list[str] | None = None, revalidate: bool = False):
+    """Download main/sample images of works already in the DB (all works by default).
+
+    Card documents are rebuilt afterwards so the API picks up the new thumbnails.
+    """
+    if not thumbnails.available():
+        print("Pillow is not installed: downloading originals only, no thumbnails.")
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT rj_code, img_url, media FROM works ORDER BY rj_code").fetchall()
+        wanted = set(rj_codes or [])
+
+        total, done = 0, []
+        for row in rows:
+            if wanted and row["rj_code"] not in wanted:
+                continue
+            try:
+                media = json.loads(row["media"]) if row["media"] else []
+            except ValueError:
+                media = []
+            total += download_images(row["rj_code"], row["img_url"], media, settings.image_root, revalidate=revalidate)
+            done.append(row["rj_code"])
+
+        conn.execute("BEGIN")
+        refresh_work_docs(conn, done)
+        bump_catalog_version(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"{total} image(s) in place under {settings.image_root}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download images of ingested works into IMAGE_ROOT")
+    parser.add_argument("rj_codes", nargs="*", help="only these works (default: all)")
+    parser.add_argument("--revalidate", action="store_true", help="confirm existing images with conditional GETs")
+    args = parser.parse_args()
+    main(args.rj_codes, revalidate=args.revalidate)
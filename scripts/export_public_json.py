@@ -1,3 +1,4 @@
+import argparse
 import json
 import sys
 from pathlib import Path
@@ -9,7 +10,8 @@ for p in (SRC, ROOT):
         sys.path.insert(0, str(p))
 
 from dlsite_app.db import get_db_connection
-from dlsite_app.config import settings
+from dlsite_app.services.migrations import migrate
+from dlsite_app.services.static_catalog import CATALOG_DIR, export_catalog
 
 
 def export_public_json(dest: Path | None = None):
@@ -18,48 +20,34 @@ def export_public_json(dest: Path | None = None):
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT 
-            w.rj_code, w.site_id, w.title, w.circle, w.release_date, w.description,
-            w.img_url, w.media, w.embeds, w.chobit_url, w.genres, w.cv, w.content_tokens,
-            s.dl_count, s.price, s.rate_average, s.wishlist_count, s.rate_count_detail
-        FROM works w
-        LEFT JOIN stats s ON w.rj_code = s.rj_code
-        """
-    )
-    rows = cursor.fetchall()
+    migrate(conn)  # make sure work_docs exists and is backfilled
+    rows = conn.execute("SELECT doc FROM work_docs ORDER BY rj_code").fetchall()
     conn.close()
 
-    result = []
-    for row in rows:
-        work = dict(row)
-
-        def safe_json_load(val):
-            if not val:
-                return []
-            try:
-                return json.loads(val)
-            except Exception:
-                return []
-
-        work["genres"] = safe_json_load(work.get("genres"))
-        work["cv"] = safe_json_load(work.get("cv"))
-        work["media"] = safe_json_load(work.get("media"))
-        work["embeds"] = safe_json_load(work.get("embeds"))
-        work["rate_count_detail"] = safe_json_load(work.get("rate_count_detail"))
-        work["content_tokens"] = safe_json_load(work.get("content_tokens"))
-
-        # prepend cv count as tag if available (mirrors API behavior)
-        if work["cv"]:
-            work["genres"] = [f"{len(work['cv'])}cv"] + work["genres"]
-
-        result.append(work)
+    # Same documents the API serves (built once at ingest by services.documents)
+    result = [json.loads(row[0]) for row in rows]
 
     output_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
     print(f"Exported {len(result)} works to {output_path}")
 
 
+def export_sharded(dest: Path | None = None):
+    """Sharded, content-hashed, precompressed export (see services.static_catalog)."""
+    conn = get_db_connection()
+    try:
+        migrate(conn)
+        manifest = export_catalog(conn, dest)
+    finally:
+        conn.close()
+    print(f"Exported {manifest['count']} works in {len(manifest['shards'])} shard(s) to {dest or CATALOG_DIR}")
+
+
 if __name__ == "__main__":
-    export_public_json()
+    parser = argparse.ArgumentParser(description="Export the catalog for deployment without DB")
+    parser.add_argument("--sharded", action="store_true", help="write static/catalog/ (index + detail shards) instead of works.json")
+    parser.add_argument("--dest", type=Path, help="output file (works.json) or directory (--sharded)")
+    args = parser.parse_args()
+    if args.sharded:
+        export_sharded(args.dest)
+    else:
+        export_public_json(args.dest)
@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 
@@ -11,4 +12,7 @@ from dlsite_app.services.ingest import ingest_json_files
 
 
 if __name__ == "__main__":
-    ingest_json_files()
+    parser = argparse.ArgumentParser(description="Ingest new or changed RJ*.json files into the DB")
+    parser.add_argument("--force", action="store_true", help="re-ingest every file, ignoring the manifest")
+    args = parser.parse_args()
+    ingest_json_files(force=args.force)
@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 
@@ -7,9 +8,10 @@ for p in (SRC, ROOT):
     if str(p) not in sys.path:
         sys.path.insert(0, str(p))
 
-from dlsite_app.config import settings
+from dlsite_app.services import job_queue
 from dlsite_app.services.scraper import save_work_to_json
 from dlsite_app.services.ingest import ingest_json_files
+from dlsite_app.services.sinks import make_sink
 
 
 CODE_DIR = ROOT / "codes"
@@ -17,48 +19,42 @@ NEW_FILE = CODE_DIR / "New_Code.txt"
 UPDATE_FILE = CODE_DIR / "Update_Code.txt"
 
 
-def load_codes(path: Path) -> list[str]:
-    if not path.exists():
-        return []
-    lines = path.read_text(encoding="utf-8").splitlines()
-    return [line.strip() for line in lines if line.strip().startswith("RJ")]
-
-
-def write_codes(path: Path, codes: list[str]):
-    uniq = sorted(set(codes))
-    path.write_text("\n".join(uniq) + ("\n" if uniq else ""), encoding="utf-8")
-
-
-def main():
-    new_codes = load_codes(NEW_FILE)
-    if not new_codes:
-        print("No codes in New_Code.txt")
-        return
-
-    update_codes = set(load_codes(UPDATE_FILE))
-    processed = []
-
-    for code in new_codes:
-        # Skip if already processed
-        if code in processed or code in update_codes:
-            continue
-        success = save_work_to_json(code, download_media=False, chobit_only=True)
-        if success:
-            processed.append(code)
-
-    # Remove processed codes from New_Code.txt
-    remaining = [c for c in new_codes if c not in processed]
-    write_codes(NEW_FILE, remaining)
-
-    # Add processed to Update_Code.txt
-    updated_list = sorted(update_codes | set(processed))
-    write_codes(UPDATE_FILE, updated_list)
-
-    # Update DB with new/updated JSON
-    if processed:
-        ingest_json_files()
-    print(f"Processed {len(processed)} code(s).")
+def main(workers: int | None = None):
+    """Drain the ``new`` jobs (New_Code.txt is synced in first and rewritten afterwards).
+
+    Scraped codes become ``update`` jobs, i.e. move to Update_Code.txt. Several
+    processes can run this at once; each claims its own jobs from the queue.
+    """
+    conn = job_queue.connect()
+    try:
+        job_queue.import_codes(conn, UPDATE_FILE, "update")
+        job_queue.import_codes(conn, NEW_FILE, "new")
+        if not any(job_queue.counts(conn, "new")[state] for state in ("pending", "running")):
+            print("No new codes queued (New_Code.txt)")
+            return
+
+        sink = make_sink()
+        results = job_queue.drain(
+            "new",
+            lambda code: save_work_to_json(code, download_media=False, chobit_only=True, sink=sink),
+            workers=workers,
+            then="update",
+        )
+        processed = [code for code, ok in results.items() if ok]
+
+        job_queue.export_codes(conn, NEW_FILE, "new", ("pending", "running", "failed"))
+        job_queue.export_codes(conn, UPDATE_FILE, "update")
+
+        # Update DB with new/updated JSON (a db sink has already written it)
+        if processed and not sink.writes_db:
+            ingest_json_files()
+        print(f"Processed {len(processed)} code(s); queue: {job_queue.counts(conn, 'new')}")
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Scrape queued new codes (chobit embed + metadata)")
+    parser.add_argument("--workers", type=int, help="concurrent scrapes (default: SCRAPE_CONCURRENCY)")
+    args = parser.parse_args()
+    main(workers=args.workers)
@@ -1,32 +1,31 @@
+import sys
 from pathlib import Path
 
-
 ROOT = Path(__file__).resolve().parents[1]
-CODE_DIR = ROOT / "codes"
-NEW_FILE = CODE_DIR / "New_Code.txt"
-UPDATE_FILE = CODE_DIR / "Update_Code.txt"
-
+SRC = ROOT / "src"
+for p in (SRC, ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
 
-def load_codes(path: Path) -> list[str]:
-    if not path.exists():
-        return []
-    lines = path.read_text(encoding="utf-8").splitlines()
-    return [line.strip() for line in lines if line.strip().startswith("RJ")]
+from dlsite_app.services import job_queue
 
 
-def write_codes(path: Path, codes: list[str]) -> None:
-    uniq = sorted(set(codes))
-    path.write_text("\n".join(uniq) + ("\n" if uniq else ""), encoding="utf-8")
+CODE_DIR = ROOT / "codes"
+NEW_FILE = CODE_DIR / "New_Code.txt"
+UPDATE_FILE = CODE_DIR / "Update_Code.txt"
 
 
 def main():
-    new_codes = load_codes(NEW_FILE)
-    update_codes = set(load_codes(UPDATE_FILE))
-
-    filtered = [code for code in new_codes if code not in update_codes]
-    removed = len(new_codes) - len(filtered)
-
-    write_codes(NEW_FILE, filtered)
+    """Sync both code files into the job queue and drop new codes that are already tracked."""
+    conn = job_queue.connect()
+    try:
+        job_queue.import_codes(conn, UPDATE_FILE, "update")
+        job_queue.drop_unlisted(conn, NEW_FILE, "new")
+        job_queue.enqueue(conn, job_queue.read_code_file(NEW_FILE), "new")
+        removed = job_queue.prune_tracked_new(conn)
+        job_queue.export_codes(conn, NEW_FILE, "new", ("pending", "running", "failed"))
+    finally:
+        conn.close()
     print(f"Removed {removed} duplicate code(s) already present in Update_Code.txt.")
 
 
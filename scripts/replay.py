@@ -0,0 +1,73 @@
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+for p in (SRC, ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from dlsite_app.config import settings
+from dlsite_app.services import replay
+from dlsite_app.services.scraper import scrape_many
+from dlsite_app.services.sinks import JsonSink
+
+
+def record(name: str, codes: list[str], images: bool = False):
+    """Scrape ``codes`` from the live sites, saving every response into the recording.
+
+    The page cache is bypassed so each request really goes out (and gets recorded);
+    scraped records and images go to a throwaway directory.
+    """
+    settings.http_record = name
+    settings.http_cache_mode = "off"
+    with tempfile.TemporaryDirectory() as tmp:
+        results = scrape_many(
+            codes,
+            sink=JsonSink(Path(tmp) / "raw"),
+            download_media=images,
+            image_root=Path(tmp) / "images",
+        )
+    ok = sum(1 for success in results.values() if success)
+    print(f"Recorded {ok}/{len(codes)} work(s) into {replay.recording_dir(name)}")
+
+
+def serve(name: str, host: str, port: int, verbose: bool):
+    recording = replay.Recording(name)
+    server = replay.ReplayServer(recording, host=host, port=port, verbose=verbose)
+    print(f"Replaying {recording.root} ({len(recording.product_codes())} product page(s)) on {server.url}")
+    print(f"Point the scraper at it with HTTP_REPLAY_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Requests served: {server.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record scraper traffic and replay it from a local stub server")
+    parser.add_argument("--name", default="default", help="recording name under CACHE_DIR/replay")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="scrape works live and record every response")
+    rec.add_argument("rj_codes", nargs="+")
+    rec.add_argument("--images", action="store_true", help="also record main/sample images")
+
+    commands.add_parser("import-cache", help="copy the raw page cache (CACHE_DIR/http) into the recording")
+
+    srv = commands.add_parser("serve", help="serve the recording over HTTP")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--verbose", action="store_true", help="log every request")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.name, args.rj_codes, images=args.images)
+    elif args.command == "import-cache":
+        print(f"Imported {replay.import_page_cache(args.name)} cached response(s) into {replay.recording_dir(args.name)}")
+    else:
+        serve(args.name, args.host, args.port, args.verbose)
@@ -0,0 +1,84 @@
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+for p in (SRC, ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from dlsite_app.services import job_queue
+from dlsite_app.services.scraper import save_work_to_json
+from dlsite_app.services.sinks import make_sink
+
+
+def status(conn):
+    for kind in job_queue.KINDS:
+        print(f"{kind:>6}: {job_queue.counts(conn, kind)}")
+    rows = conn.execute(
+        "SELECT rj_code, kind, attempts, last_error FROM scrape_jobs WHERE state = 'failed' ORDER BY updated_at DESC LIMIT 10"
+    ).fetchall()
+    for row in rows:
+        print(f"  failed {row['kind']} {row['rj_code']} after {row['attempts']} attempt(s): {row['last_error']}")
+
+
+def work(kind: str, workers: int | None, limit: int | None):
+    """Drain ready jobs of ``kind``; start one process per machine/core as needed."""
+    sink = make_sink()
+    chobit_only = kind == "new"
+    results = job_queue.drain(
+        kind,
+        lambda code: save_work_to_json(code, download_media=False, chobit_only=chobit_only, sink=sink),
+        workers=workers,
+        limit=limit,
+        then="update" if kind == "new" else None,
+    )
+    ok = sum(1 for success in results.values() if success)
+    print(f"{ok}/{len(results)} {kind} job(s) succeeded.")
+    if ok and not sink.writes_db:
+        print("Records were written as JSON: run scripts/ingest_data.py to load them.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and work the SQLite scrape job queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("status", help="jobs per kind and state, latest failures")
+
+    imp = commands.add_parser("import", help="enqueue the codes of a text file")
+    imp.add_argument("kind", choices=job_queue.KINDS)
+    imp.add_argument("path", type=Path)
+    imp.add_argument("--priority", type=int, default=0, help="higher runs first")
+
+    exp = commands.add_parser("export", help="write queued codes to a text file")
+    exp.add_argument("kind", choices=job_queue.KINDS)
+    exp.add_argument("path", type=Path)
+    exp.add_argument("--state", action="append", choices=job_queue.STATES, help="only these states (repeatable)")
+
+    wrk = commands.add_parser("work", help="drain ready jobs (safe to run in several processes)")
+    wrk.add_argument("kind", choices=job_queue.KINDS)
+    wrk.add_argument("--workers", type=int, help="threads in this process (default: SCRAPE_CONCURRENCY)")
+    wrk.add_argument("--limit", type=int, help="stop after claiming this many jobs")
+
+    rty = commands.add_parser("retry", help="put failed jobs back in the queue")
+    rty.add_argument("kind", choices=job_queue.KINDS)
+
+    args = parser.parse_args()
+    conn = job_queue.connect()  # also brings the schema up to date
+    try:
+        if args.command == "work":
+            work(args.kind, args.workers, args.limit)
+        elif args.command == "status":
+            status(conn)
+        elif args.command == "import":
+            added = job_queue.import_codes(conn, args.path, args.kind, priority=args.priority)
+            print(f"Queued {added} new {args.kind} job(s) from {args.path}")
+        elif args.command == "export":
+            states = tuple(args.state) if args.state else job_queue.STATES
+            print(f"Wrote {job_queue.export_codes(conn, args.path, args.kind, states)} code(s) to {args.path}")
+        elif args.command == "retry":
+            failed = job_queue.codes(conn, args.kind, ("failed",))
+            print(f"Requeued {job_queue.enqueue(conn, failed, args.kind, requeue=True)} failed {args.kind} job(s)")
+    finally:
+        conn.close()
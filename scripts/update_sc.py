@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 
@@ -7,32 +8,79 @@ for p in (SRC, ROOT):
     if str(p) not in sys.path:
         sys.path.insert(0, str(p))
 
-from dlsite_app.services.scraper import save_work_to_json
+from dlsite_app.services import job_queue, refresh_scheduler
+from dlsite_app.services.scraper import refresh_dynamic_data, save_work_to_json
 from dlsite_app.services.ingest import ingest_json_files
+from dlsite_app.services.sinks import make_sink
 
 
 UPDATE_FILE = ROOT / "codes" / "Update_Code.txt"
 
 
-def load_codes(path: Path) -> list[str]:
-    if not path.exists():
-        return []
-    lines = path.read_text(encoding="utf-8").splitlines()
-    return [line.strip() for line in lines if line.strip().startswith("RJ")]
+def main(
+    stats_only: bool = False,
+    workers: int | None = None,
+    scheduled: bool = False,
+    mode: str = "both",
+    budget: int | None = None,
+):
+    """Refresh tracked works (``update`` jobs; Update_Code.txt is synced in first).
 
+    A full refresh is one round over the queue: it resumes an unfinished round left by
+    a crashed run, otherwise starts a new one. ``scheduled`` refreshes only what is due
+    (see services.refresh_scheduler), within ``budget`` requests.
+    """
+    conn = job_queue.connect()
+    try:
+        job_queue.import_codes(conn, UPDATE_FILE, "update")
+        codes = job_queue.codes(conn, "update")
+        if not codes:
+            print("No codes in Update_Code.txt")
+            return
 
-def main():
-    codes = load_codes(UPDATE_FILE)
-    if not codes:
-        print("No codes in Update_Code.txt")
-        return
+        sink = make_sink()
+        if scheduled:
+            plan = refresh_scheduler.plan_refresh(conn, codes, mode=mode, budget=budget)
+            print(f"Refresh plan: {plan.summary()}")
+            done = refresh_scheduler.run_plan(plan, sink=sink, workers=workers)
+            updated = done["static"] + done["dynamic"]
+        elif stats_only:
+            # DL count / price / rating only, many works per request
+            updated = len(refresh_dynamic_data(codes, sink=sink))
+        else:
+            requeued = job_queue.begin_round(conn, "update")
+            if not requeued:
+                print(f"Resuming refresh round: {job_queue.counts(conn, 'update')}")
+            results = job_queue.drain(
+                "update",
+                lambda code: save_work_to_json(code, download_media=False, sink=sink),
+                workers=workers,
+            )
+            updated = sum(1 for ok in results.values() if ok)
+            if job_queue.end_round(conn, "update"):
+                print("Refresh round complete.")
+        job_queue.export_codes(conn, UPDATE_FILE, "update")
 
-    for code in codes:
-        save_work_to_json(code, download_media=False)
-
-    ingest_json_files()
-    print(f"Updated {len(codes)} code(s).")
+        if not sink.writes_db:
+            ingest_json_files()
+        print(f"Updated {updated} code(s).")
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Refresh works listed in Update_Code.txt")
+    parser.add_argument("--stats-only", action="store_true", help="only refresh dynamic stats (batched)")
+    parser.add_argument("--workers", type=int, help="concurrent scrapes (default: SCRAPE_CONCURRENCY)")
+    parser.add_argument("--scheduled", action="store_true", help="only refresh what is due, most stale first")
+    parser.add_argument("--mode", choices=refresh_scheduler.MODES, default="both",
+                        help="with --scheduled: static pages, stats, or both")
+    parser.add_argument("--budget", type=int, help="with --scheduled: max requests this run (default: REFRESH_BUDGET)")
+    args = parser.parse_args()
+    main(
+        stats_only=args.stats_only,
+        workers=args.workers,
+        scheduled=args.scheduled,
+        mode=args.mode,
+        budget=args.budget,
+    )
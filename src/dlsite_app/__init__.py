@@ -1,7 +1,15 @@
-from flask import Flask, render_template, send_from_directory
+import re
+
+from flask import Flask, abort, render_template, request, send_from_directory
 
 from dlsite_app.config import settings
 from dlsite_app.routes.api import api_bp
+from dlsite_app.services import static_catalog
+from dlsite_app.services.thumbnails import variant_names
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+RJ_CODE_RE = re.compile(r"RJ\d+")
 
 
 def create_app() -> Flask:
@@ -16,6 +24,9 @@ def create_app() -> Flask:
 
     @app.after_request
     def add_header(response):
+        # Views that manage their own caching (ETag revalidation) set Cache-Control themselves
+        if 'Cache-Control' in response.headers:
+            return response
         response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '-1'
@@ -25,6 +36,36 @@ def create_app() -> Flask:
     def index():
         return render_template("index.html")
 
+    @app.route("/static/catalog/<name>")
+    def static_catalog_file(name: str):
+        # Precompressed siblings of the sharded export; hashed names never change
+        catalog_dir = static_catalog.CATALOG_DIR
+        encodings = request.accept_encodings
+        filename, encoding = name, None
+        for suffix, coding in ((".br", "br"), (".gz", "gzip")):
+            if encodings[coding] and (catalog_dir / (name + suffix)).is_file():
+                filename, encoding = name + suffix, coding
+                break
+        response = send_from_directory(catalog_dir, filename, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        if name == static_catalog.MANIFEST_NAME:
+            response.headers["Cache-Control"] = "no-cache"
+        else:
+            response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        return response
+
+    @app.route("/images/<rj_code>/thumbs/<variant>")
+    def thumbnail(rj_code: str, variant: str):
+        # URLs carry ?v=<source hash>, so a variant can be cached for good
+        # rj_code becomes a directory name: no "..", no other paths
+        if not RJ_CODE_RE.fullmatch(rj_code) or variant not in variant_names():
+            abort(404)
+        response = send_from_directory(settings.image_root / rj_code / "thumbs", variant)
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        return response
+
     @app.route("/images/<path:filename>")
     def images(filename: str):
         return send_from_directory(settings.image_root, filename)
@@ -16,6 +16,10 @@ class Settings:
     public_data_dir: Path = Path(os.getenv("PUBLIC_DATA_DIR", BASE_DIR / "data" / "public"))
     image_root: Path = Path(os.getenv("IMAGE_ROOT", BASE_DIR / "images"))
     db_path: Path = Path(os.getenv("ASMR_DB_PATH", BASE_DIR / "data" / "cache" / "asmr.db"))
+    # SQLite tuning: per-connection page cache (KiB), memory-mapped I/O (bytes), lock wait (s)
+    sqlite_cache_kb: int = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+    sqlite_mmap_size: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    sqlite_busy_timeout: float = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))
     affiliate_id: str = os.getenv("AFFILIATE_ID", "gentleman_dl")
     # Try affiliate tool page if main HTML does not expose chobit embed
     enable_chobit_affiliate_fallback: bool = (
@@ -23,6 +27,40 @@ class Settings:
     )
     # Try chobit.cc search page to find embed codes
     enable_chobit_search: bool = os.getenv("FETCH_CHOBIT_SEARCH", "true").lower() == "true"
+    # How long a fallback result is trusted: found embeds / "no embed" (days; 0 = always retry)
+    chobit_cache_ttl_days: float = float(os.getenv("CHOBIT_CACHE_TTL_DAYS", "30"))
+    chobit_negative_ttl_days: float = float(os.getenv("CHOBIT_NEGATIVE_TTL_DAYS", "7"))
+    # Concurrent scraping: worker threads and per-host politeness budgets (requests/second)
+    scrape_concurrency: int = int(os.getenv("SCRAPE_CONCURRENCY", "4"))
+    rate_limit_dlsite: float = float(os.getenv("RATE_LIMIT_DLSITE", "1.0"))
+    rate_limit_chobit: float = float(os.getenv("RATE_LIMIT_CHOBIT", "0.5"))
+    rate_limit_images: float = float(os.getenv("RATE_LIMIT_IMAGES", "4.0"))
+    # Parallel image downloads per work (still bounded by RATE_LIMIT_IMAGES)
+    image_concurrency: int = int(os.getenv("IMAGE_CONCURRENCY", "8"))
+    # Scraper HTTP client: retries on timeouts/5xx with exponential backoff (seconds)
+    http_retries: int = int(os.getenv("HTTP_RETRIES", "3"))
+    http_backoff: float = float(os.getenv("HTTP_BACKOFF", "0.5"))
+    http_backoff_max: float = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+    # Raw page cache under cache_dir: revalidate (conditional GET), offline (replay only), off
+    http_cache_mode: str = os.getenv("HTTP_CACHE_MODE", "revalidate").lower()
+    # Record scraper traffic under cache_dir/replay/<name>, or send it to a replay stub URL
+    http_record: str = os.getenv("HTTP_RECORD", "")
+    http_replay_url: str = os.getenv("HTTP_REPLAY_URL", "")
+    # Scraper output: json (RJxxx.json for a later ingest), db (upsert as scraped), or both
+    scrape_sink: str = os.getenv("SCRAPE_SINK", "json").lower()
+    # Scrape job queue: attempts before a job is marked failed, lease length and retry
+    # backoff (seconds; doubles per attempt up to the max)
+    job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    job_lease_seconds: float = float(os.getenv("JOB_LEASE_SECONDS", "900"))
+    job_retry_backoff: float = float(os.getenv("JOB_RETRY_BACKOFF", "60"))
+    job_retry_backoff_max: float = float(os.getenv("JOB_RETRY_BACKOFF_MAX", "3600"))
+    # Scheduled refreshes (update_sc.py --scheduled): static page cycle in days, requests per
+    # run (0 = no limit) and the share of that budget static refreshes may use
+    static_refresh_days: float = float(os.getenv("STATIC_REFRESH_DAYS", "60"))
+    refresh_budget: int = int(os.getenv("REFRESH_BUDGET", "0"))
+    refresh_static_share: float = float(os.getenv("REFRESH_STATIC_SHARE", "0.25"))
+    # Product ids per product/info/ajax request for stats-only refreshes
+    dynamic_batch_size: int = int(os.getenv("DYNAMIC_BATCH_SIZE", "50"))
 
     @property
     def data_dir(self) -> Path:
@@ -1,16 +1,72 @@
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 
 from dlsite_app.config import settings
 
 
+_readers = threading.local()
+
+
+def _tune(conn: sqlite3.Connection):
+    conn.execute(f"PRAGMA cache_size = -{settings.sqlite_cache_kb}")
+    conn.execute(f"PRAGMA mmap_size = {settings.sqlite_mmap_size}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+
 def get_db_connection():
+    """Writer connection (ingest, scraper sinks, scripts), tuned for bulk writes.
+
+    WAL is persistent in the DB file, so once a writer has set it, readers keep reading
+    while ingest writes.
+    """
     settings.db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(settings.db_path)
+    conn = sqlite3.connect(settings.db_path, timeout=settings.sqlite_busy_timeout)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    _tune(conn)
     return conn
 
 
+def open_read_connection() -> sqlite3.Connection:
+    """New read-only connection (``mode=ro`` + ``query_only``); raises sqlite3.Error if the DB is missing."""
+    conn = sqlite3.connect(
+        f"file:{settings.db_path.as_posix()}?mode=ro",
+        uri=True,
+        timeout=settings.sqlite_busy_timeout,
+        check_same_thread=False,  # streamed responses may be finished by another thread
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    _tune(conn)
+    return conn
+
+
+def get_read_connection() -> sqlite3.Connection:
+    """This thread's read-only connection, opened once and reused across requests.
+
+    Callers must not close it. A DB file replaced on disk (new inode) gets a fresh one.
+    """
+    stat = os.stat(settings.db_path)
+    identity = (str(settings.db_path), stat.st_dev, stat.st_ino)
+    conn = getattr(_readers, "conn", None)
+    if conn is not None and _readers.identity == identity:
+        return conn
+    close_read_connection()
+    conn = open_read_connection()
+    _readers.conn, _readers.identity = conn, identity
+    return conn
+
+
+def close_read_connection():
+    conn = getattr(_readers, "conn", None)
+    if conn is not None:
+        conn.close()
+        _readers.conn = None
+
+
 @contextmanager
 def db_connection():
     """Context manager wrapper to ensure connections are closed."""
@@ -19,3 +75,20 @@ def db_connection():
         yield conn
     finally:
         conn.close()
+
+
+def catalog_version(conn) -> str:
+    """Opaque token that changes whenever ingest commits new catalog data."""
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'catalog_version'").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row:
+        return f"db-{row[0]}"
+    # Schema not migrated yet: fall back to the file timestamp
+    return f"mtime-{settings.db_path.stat().st_mtime_ns}"
+
+
+def bump_catalog_version(conn):
+    """Invalidate cached API responses; call inside the writing transaction."""
+    conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'catalog_version'")
@@ -1,99 +1,427 @@
+import bisect
+import hashlib
 import json
+from functools import wraps
 from pathlib import Path
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, make_response, request
 
 from dlsite_app.config import settings
-from dlsite_app.db import get_db_connection
+from dlsite_app.db import catalog_version, get_read_connection, open_read_connection
+from dlsite_app.services.documents import (
+    ALL_FIELDS,
+    CARD_FIELDS,
+    encode,
+    project,
+)
+from dlsite_app.services import static_catalog
+from dlsite_app.services.response_cache import ResponseCache
+from dlsite_app.services.search import (
+    FormulaError,
+    compile_formula,
+    fts_match_expression,
+    fts_ranked_codes,
+    fts_snippets,
+    search_works,
+    tag_filter_sql,
+)
 
 
 api_bp = Blueprint("api", __name__)
 STATIC_WORKS_PATH = settings.base_dir / "static" / "works.json"
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+DEFAULT_SEARCH_LIMIT = 50
+STREAM_BATCH_SIZE = 500
+response_cache = ResponseCache()
 
 
-def generate_affiliate_link(work: dict) -> str | None:
-    rj_code = work.get("rj_code")
-    if not rj_code:
-        return None
-    site_id = work.get("site_id", "maniax")
-    return (
-        f"https://dlaf.jp/{site_id}/dlaf/=/t/i/link/work/aid/{settings.affiliate_id}/id/{rj_code}.html"
-    )
+def static_snapshot() -> tuple[static_catalog.Snapshot | None, tuple[str, ...]]:
+    """The static catalog file in use and the fields its documents carry.
+
+    Prefers the sharded export's card index (see services.static_catalog) and falls back
+    to the single works.json snapshot. Both are kept in memory until their mtime changes.
+    """
+    manifest = static_catalog.load_manifest()
+    if manifest is not None:
+        return static_catalog.index_snapshot(manifest), CARD_FIELDS
+    return static_catalog.snapshots.get(Path(STATIC_WORKS_PATH)), ALL_FIELDS
 
 
 def load_static_works() -> list[dict]:
     """Fallback loader when DB is absent (e.g., Vercel static deploy)."""
-    path = Path(STATIC_WORKS_PATH)
-    if not path.exists():
-        return []
+    snapshot, _ = static_snapshot()
+    return snapshot.data if snapshot else []
+
+
+def load_static_work(rj_code: str) -> dict | None:
+    """Full static document of one work (reads a single shard when exported sharded)."""
+    manifest = static_catalog.load_manifest()
+    if manifest is not None:
+        return static_catalog.load_detail(manifest, rj_code)
+    snapshot = static_catalog.snapshots.get(Path(STATIC_WORKS_PATH))
+    return snapshot.get(rj_code) if snapshot else None
+
+
+def _static_details(works: list[dict], fields: tuple[str, ...]) -> list[dict]:
+    """Fill in non-card fields of a page of static works from their detail documents."""
+    if set(fields) <= set(CARD_FIELDS) or static_catalog.load_manifest() is None:
+        return works
+    return [{**work, **(load_static_work(work["rj_code"]) or {})} for work in works]
+
+
+def parse_fields(raw: str | None) -> tuple[str, ...]:
+    """Turn a ``fields=`` query value into a known field tuple (card fields by default)."""
+    if not raw:
+        return CARD_FIELDS
+    if raw.strip() == "all":
+        return ALL_FIELDS
+    fields = [f.strip() for f in raw.split(",") if f.strip() in ALL_FIELDS]
+    if "rj_code" not in fields:
+        fields.insert(0, "rj_code")
+    return tuple(dict.fromkeys(fields))
+
+
+def parse_limit(raw: str | None, default: int = DEFAULT_PAGE_SIZE) -> int:
+    try:
+        limit = int(raw) if raw else default
+    except ValueError:
+        limit = default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_offset(raw: str | None) -> int:
+    try:
+        return max(0, int(raw or 0))
+    except ValueError:
+        return 0
+
+
+def _doc_column(fields: tuple[str, ...]) -> str:
+    return "d.card" if set(fields) <= set(CARD_FIELDS) else "d.doc"
+
+
+def _docs_query(
+    column: str,
+    cursor: str | None = None,
+    limit: int | None = None,
+    rj_code: str | None = None,
+    where: list[tuple[str, list]] | None = None,
+) -> tuple[str, list]:
+    query = f"""
+        SELECT d.rj_code, {column}
+        FROM work_docs d
+        JOIN works w ON w.rj_code = d.rj_code
+        LEFT JOIN stats s ON s.rj_code = d.rj_code
+    """
+    conditions = list(where or [])
+    if rj_code:
+        conditions.append(("d.rj_code = ?", [rj_code]))
+    elif cursor:
+        conditions.append(("d.rj_code > ?", [cursor]))
+    params: list = []
+    if conditions:
+        query += " WHERE " + " AND ".join(f"({sql})" for sql, _ in conditions)
+        for _, values in conditions:
+            params.extend(values)
+    query += " ORDER BY d.rj_code"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+
+def query_docs(
+    conn,
+    column: str = "d.doc",
+    cursor: str | None = None,
+    limit: int | None = None,
+    rj_code: str | None = None,
+    where: list[tuple[str, list]] | None = None,
+) -> list[tuple[str, str]]:
+    """``(rj_code, encoded document)`` pairs from work_docs, ordered by rj_code.
+
+    ``where`` conditions may reference ``w`` (works) and ``s`` (stats).
+    """
+    query, params = _docs_query(column, cursor, limit, rj_code, where)
+    return [(row[0], row[1]) for row in conn.execute(query, params)]
+
+
+def iter_docs(conn, column: str = "d.doc", batch_size: int = STREAM_BATCH_SIZE, **kwargs):
+    """Like :func:`query_docs`, but yields lists of at most ``batch_size`` pairs."""
+    query, params = _docs_query(column, **kwargs)
+    cur = conn.execute(query, params)
+    try:
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [(row[0], row[1]) for row in rows]
+    finally:
+        cur.close()  # an abandoned stream must not keep its read snapshot open
+
+
+def query_works(conn, fields: tuple[str, ...] = ALL_FIELDS, **kwargs) -> list[dict]:
+    """Decoded and projected documents; see :func:`query_docs` for the filters."""
+    docs = query_docs(conn, _doc_column(fields), **kwargs)
+    return [project(json.loads(doc), fields) for _, doc in docs]
+
+
+def _page(works: list[dict], limit: int | None) -> dict:
+    next_cursor = works[-1]["rj_code"] if len(works) == limit else None
+    return {"items": works, "next_cursor": next_cursor}
+
+
+def _catalog_connection(pooled: bool = True):
+    """Read-only connection to a DB that holds works, else None (missing/empty DB).
+
+    The pooled connection belongs to this thread and stays open; ``pooled=False`` opens
+    a private one the caller must close (used by streamed responses).
+    """
+    conn = None
     try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            return data
+        conn = get_read_connection() if pooled else open_read_connection()
+        if conn.execute("SELECT 1 FROM works LIMIT 1").fetchone() is not None:
+            return conn
     except Exception:
         pass
-    return []
+    if conn is not None and not pooled:
+        conn.close()
+    return None
 
 
-@api_bp.route("/works")
-def works():
-    rows = []
+def _from_db(fetch):
+    """Run ``fetch(conn)``; None means the DB is unavailable or holds no works."""
+    conn = _catalog_connection()
+    if conn is None:
+        return None
     try:
-        conn = get_db_connection()
-        query = """
-            SELECT 
-                w.rj_code, w.site_id, w.title, w.circle, w.release_date, w.description, w.img_url, w.media, w.embeds, w.chobit_url, w.genres, w.cv, w.content_tokens,
-                s.dl_count, s.price, s.rate_average, s.wishlist_count, s.rate_count_detail
-            FROM works w
-            LEFT JOIN stats s ON w.rj_code = s.rj_code
-        """
-        rows = conn.execute(query).fetchall()
+        return fetch(conn)
     except Exception:
-        rows = []
+        return None
+
+
+def _static_page(fields: tuple[str, ...], cursor: str | None, limit: int | None) -> list[dict]:
+    static_data = load_static_works()
+    # Both exports are written in rj_code order; only sort hand-edited files
+    codes = [w.get("rj_code") or "" for w in static_data]
+    if codes != sorted(codes):
+        static_data = sorted(static_data, key=lambda w: w.get("rj_code") or "")
+    if cursor:
+        static_data = [w for w in static_data if (w.get("rj_code") or "") > cursor]
+    return [project(w, fields) for w in _static_details(static_data[:limit], fields)]
+
+
+def _docs_response(docs: list[str], next_cursor: str | None) -> Response:
+    body = '{"items":[' + ",".join(docs) + '],"next_cursor":' + json.dumps(next_cursor) + "}"
+    return Response(body, mimetype="application/json")
+
+
+def _static_docs_page(fields: tuple[str, ...], cursor: str | None, limit: int | None) -> Response | None:
+    """A page of the static snapshot spliced from its pre-encoded documents.
+
+    Only when ``fields`` is the shape the snapshot stores (else None: the caller
+    projects with :func:`_static_page`, which may also read detail shards).
+    """
+    snapshot, snapshot_fields = static_snapshot()
+    if snapshot is None or fields != snapshot_fields:
+        return None
+    codes, docs = snapshot.encoded(fields)
+    start = bisect.bisect_right(codes, cursor) if cursor else 0
+    page = docs[start : start + limit] if limit else docs[start:]
+    next_cursor = codes[start + limit - 1] if limit and len(page) == limit else None
+    return _docs_response(page, next_cursor)
+
+
+def current_catalog_version() -> str:
+    version = _from_db(catalog_version)
+    if version is not None:
+        return version
+    snapshot, _ = static_snapshot()
+    return snapshot.etag if snapshot else "static-none"
+
+
+def cached_json(view):
+    """Serve a JSON view from the in-process cache, keyed on catalog version and query.
+
+    The encoded body is built once per catalog version; clients revalidate with
+    ``If-None-Match`` and get a 304 when nothing changed. Non-200 responses are not cached.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = current_catalog_version()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        entry = response_cache.get(version, key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = response_cache.put(version, key, response.get_data())
+
+        if entry.etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(entry.body, mimetype="application/json")
+        response.set_etag(entry.etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    return wrapper
+
+
+def _stream_works(conn, fields: tuple[str, ...], cursor: str | None, limit: int | None):
+    """Yield the /works body in chunks, one ``fetchmany`` batch at a time.
+
+    Memory stays at one batch however large the catalog is; ``conn`` is closed when
+    the generator finishes or the client goes away.
+    """
+    exact = fields in (CARD_FIELDS, ALL_FIELDS)
+    last, count = None, 0
+    try:
+        yield '{"items":['
+        for batch in iter_docs(conn, _doc_column(fields), cursor=cursor, limit=limit):
+            docs = [doc if exact else encode(project(json.loads(doc), fields)) for _, doc in batch]
+            yield ("," if count else "") + ",".join(docs)
+            last, count = batch[-1][0], count + len(batch)
     finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+        conn.close()
+    next_cursor = last if limit and count == limit else None
+    yield '],"next_cursor":' + json.dumps(next_cursor) + "}"
 
-    # If DB is unavailable or empty (e.g., Vercel), serve static snapshot
-    if not rows:
-        static_data = load_static_works()
-        return jsonify(static_data)
-
-    result = []
-    for row in rows:
-        work = dict(row)
-        def safe_json_load(key):
-            val = work.get(key)
-            if not val:
-                return []
-            try:
-                return json.loads(val)
-            except Exception:
-                return []
-
-        work["genres"] = safe_json_load("genres")
-
-        # CV cleanup
-        if work.get("cv"):
-            try:
-                raw_cv = json.loads(work["cv"])
-                clean_cv = [c for c in raw_cv if c and c.strip() and c != "/"]
-                work["cv"] = clean_cv
-                if clean_cv:
-                    work["genres"].insert(0, f"{len(clean_cv)}cv")
-            except Exception:
-                work["cv"] = []
+
+def streaming_works():
+    """``/works?stream=1``: the whole catalog (or ``limit`` works) as a streamed response.
+
+    Bypasses the response cache, which would have to buffer the body; the ETag is derived
+    from the catalog version and the query, so revalidation still returns 304 cheaply.
+    """
+    fields = parse_fields(request.args.get("fields"))
+    cursor = request.args.get("cursor") or None
+    limit = int(request.args["limit"]) if request.args.get("limit", "").isdigit() else None
+
+    version = current_catalog_version()
+    query = repr(sorted(request.args.items(multi=True))).encode("utf-8")
+    etag = f"{version}-s{hashlib.sha1(query).hexdigest()[:16]}"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        conn = _catalog_connection(pooled=False)
+        snapshot, snapshot_fields = static_snapshot() if conn is None else (None, ())
+        if snapshot is not None and fields == snapshot_fields and not cursor and not limit:
+            # The whole static file, as stored: no parse, no re-encode
+            body = (b'{"items":', snapshot.body, b',"next_cursor":null}')
+            response = Response(body, mimetype="application/json")
+        elif conn is None:
+            response = _static_docs_page(fields, cursor, limit)
+            if response is None:
+                response = jsonify(_page(_static_page(fields, cursor, limit), limit))
         else:
-            work["cv"] = []
+            response = Response(_stream_works(conn, fields, cursor, limit), mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@api_bp.route("/works")
+def works():
+    if request.args.get("stream") in ("1", "true"):
+        return streaming_works()
+    return paged_works()
+
+
+@cached_json
+def paged_works():
+    fields = parse_fields(request.args.get("fields"))
+    limit = parse_limit(request.args.get("limit"))
+    cursor = request.args.get("cursor") or None
+
+    if fields in (CARD_FIELDS, ALL_FIELDS):
+        # Stored documents already have this exact shape: splice the bytes together
+        docs = _from_db(lambda conn: query_docs(conn, _doc_column(fields), cursor=cursor, limit=limit))
+        if docs is not None:
+            next_cursor = docs[-1][0] if len(docs) == limit else None
+            return _docs_response([doc for _, doc in docs], next_cursor)
+
+    items = _from_db(lambda conn: query_works(conn, fields, cursor=cursor, limit=limit))
+    # If DB is unavailable or empty (e.g., Vercel), serve static snapshot
+    if items is None:
+        static_page = _static_docs_page(fields, cursor, limit)
+        if static_page is not None:
+            return static_page
+        items = _static_page(fields, cursor, limit)
+    return jsonify(_page(items, limit))
+
+
+@api_bp.route("/works/<rj_code>")
+@cached_json
+def work_detail(rj_code: str):
+    docs = _from_db(lambda conn: query_docs(conn, "d.doc", rj_code=rj_code))
+    if docs:
+        return Response(docs[0][1], mimetype="application/json")
+    found = None if docs is not None else load_static_work(rj_code)
+    if not found:
+        return jsonify({"error": "work not found", "rj_code": rj_code}), 404
+    return jsonify(found)
+
+
+@api_bp.route("/search")
+@cached_json
+def search():
+    """Filter and rank on the server: ?q=&include=&exclude=&sort=dl/price&limit=&offset=.
+
+    Free-text ``q`` goes through the works_fts index when possible (descriptions included,
+    bm25 order unless ``sort`` is given) and each hit carries a highlighted ``snippet``.
+    """
+    fields = parse_fields(request.args.get("fields"))
+    limit = parse_limit(request.args.get("limit"), DEFAULT_SEARCH_LIMIT)
+    offset = parse_offset(request.args.get("offset"))
+    query = request.args.get("q", "")
+    include = request.args.getlist("include")
+    exclude = request.args.getlist("exclude")
+    formula = request.args.get("sort") or None
+    try:
+        if formula:
+            compile_formula(formula)
+    except FormulaError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Search always needs the card fields to filter and score; project afterwards
+    load_fields = tuple(dict.fromkeys(CARD_FIELDS + fields))
+
+    # Narrow the rows read from SQLite with the indexed tag/cv/circle lookups;
+    # search_works() still applies the exact rules to whatever comes back.
+    where = []
+    for tag in include:
+        condition = tag_filter_sql(tag)
+        if condition:
+            where.append(condition)
+    for tag in exclude:
+        condition = tag_filter_sql(tag)
+        if condition:
+            where.append((f"NOT ({condition[0]})", condition[1]))
+
+    def run(catalog: list[dict], text: str) -> tuple[int, list[dict]]:
+        return search_works(catalog, text, include, exclude, formula, limit=limit, offset=offset)
 
-        work["media"] = safe_json_load("media")
-        work["embeds"] = safe_json_load("embeds")
-        work["rate_count_detail"] = safe_json_load("rate_count_detail")
-        work["content_tokens"] = safe_json_load("content_tokens")
+    def from_db(conn):
+        match = fts_match_expression(query)
+        ranked = fts_ranked_codes(conn, match) if match else None
+        if ranked is None:
+            return (*run(query_works(conn, load_fields, where=where), query), {})
+        fts_where = where + [("w.rj_code IN (SELECT rj_code FROM works_fts WHERE works_fts MATCH ?)", [match])]
+        rank = {code: i for i, code in enumerate(ranked)}
+        rows = sorted(query_works(conn, load_fields, where=fts_where), key=lambda w: rank[w["rj_code"]])
+        total, page = run(rows, "")
+        return total, page, fts_snippets(conn, match, [w["rj_code"] for w in page])
 
-        work["affiliate_url"] = generate_affiliate_link(work)
-        result.append(work)
+    result = _from_db(from_db)
+    if result is None:
+        total, page = run(load_static_works(), query)
+        result = (total, _static_details(page, fields), {})
+    total, page, snippets = result
 
-    return jsonify(result)
+    items = [
+        {**project(work, fields), "score": work["score"], "snippet": snippets.get(work["rj_code"])}
+        for work in page
+    ]
+    return jsonify({"items": items, "total": total, "offset": offset, "limit": limit})
@@ -0,0 +1,80 @@
+"""Remembered outcomes of the chobit embed fallbacks (SQLite ``chobit_cache`` table).
+
+When a product page has no chobit iframe, finding the embed costs up to three more
+requests (affiliate tool page, chobit search, first search hit). The result is kept
+per work: a found URL with the strategy that found it, or ``chobit_url = NULL`` when
+every strategy came back empty. Found URLs are trusted for CHOBIT_CACHE_TTL_DAYS,
+misses for CHOBIT_NEGATIVE_TTL_DAYS; once an entry is stale the fallbacks run again,
+starting with the strategy that last succeeded.
+"""
+
+import sqlite3
+import threading
+import time
+
+from dlsite_app.config import settings
+from dlsite_app.db import get_db_connection
+from dlsite_app.services.migrations import migrate
+
+
+DAY = 86400
+
+# Databases already migrated by this process (settings.db_path can change, e.g. per benchmark run)
+_migrated: set[str] = set()
+_migrate_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = get_db_connection()
+    db_path = str(settings.db_path)
+    if db_path not in _migrated:
+        with _migrate_lock:
+            if db_path not in _migrated:
+                migrate(conn)
+                _migrated.add(db_path)
+    return conn
+
+
+def is_fresh(entry: dict, now: float | None = None) -> bool:
+    ttl_days = settings.chobit_cache_ttl_days if entry["chobit_url"] else settings.chobit_negative_ttl_days
+    return (now or time.time()) - entry["checked_at"] < ttl_days * DAY
+
+
+def lookup(rj_code: str) -> dict | None:
+    """Cached ``{"chobit_url", "strategy", "checked_at"}`` of ``rj_code`` (fresh or not)."""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                "SELECT chobit_url, strategy, checked_at FROM chobit_cache WHERE rj_code = ?", (rj_code,)
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        print(f"[{rj_code}] Chobit cache unavailable: {exc}")
+        return None
+    return dict(row) if row else None
+
+
+def store(rj_code: str, chobit_url: str | None, strategy: str | None):
+    """Record a resolution; ``chobit_url=None`` records that no strategy found an embed."""
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO chobit_cache (rj_code, chobit_url, strategy, checked_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(rj_code) DO UPDATE SET
+                        chobit_url = excluded.chobit_url,
+                        -- a miss keeps the last winner so it is tried first next time
+                        strategy = COALESCE(excluded.strategy, chobit_cache.strategy),
+                        checked_at = excluded.checked_at
+                    """,
+                    (rj_code, chobit_url, strategy, time.time()),
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        print(f"[{rj_code}] Chobit cache write failed: {exc}")
@@ -0,0 +1,123 @@
+"""Build the public per-work JSON document once, at ingest time.
+
+The API and the static exporter both read the pre-encoded ``work_docs`` rows instead of
+re-decoding the works/stats columns on every request.
+"""
+
+import json
+
+from dlsite_app.config import settings
+from dlsite_app.services import thumbnails
+
+
+# Everything the grid needs to render and sort a card; the rest comes from /works/<rj_code>.
+CARD_FIELDS = (
+    "rj_code",
+    "title",
+    "circle",
+    "release_date",
+    "img_url",
+    "thumbs",
+    "genres",
+    "cv",
+    "dl_count",
+    "price",
+    "rate_average",
+    "wishlist_count",
+)
+ALL_FIELDS = (
+    "rj_code",
+    "site_id",
+    "title",
+    "circle",
+    "release_date",
+    "description",
+    "img_url",
+    "thumbs",
+    "media",
+    "embeds",
+    "chobit_url",
+    "genres",
+    "cv",
+    "content_tokens",
+    "dl_count",
+    "price",
+    "rate_average",
+    "wishlist_count",
+    "rate_count_detail",
+    "affiliate_url",
+)
+JSON_COLUMNS = ("genres", "cv", "media", "embeds", "rate_count_detail", "content_tokens")
+SOURCE_QUERY = """
+    SELECT
+        w.rj_code, w.site_id, w.title, w.circle, w.release_date, w.description, w.img_url, w.media, w.embeds, w.chobit_url, w.genres, w.cv, w.content_tokens,
+        s.dl_count, s.price, s.rate_average, s.wishlist_count, s.rate_count_detail
+    FROM works w
+    LEFT JOIN stats s ON w.rj_code = s.rj_code
+"""
+
+
+def generate_affiliate_link(work: dict) -> str | None:
+    rj_code = work.get("rj_code")
+    if not rj_code:
+        return None
+    site_id = work.get("site_id", "maniax")
+    return (
+        f"https://dlaf.jp/{site_id}/dlaf/=/t/i/link/work/aid/{settings.affiliate_id}/id/{rj_code}.html"
+    )
+
+
+def clean_cv(values: list | None) -> list[str]:
+    """Drop blank and placeholder ("/") CV entries."""
+    return [c.strip() for c in values or [] if isinstance(c, str) and c.strip() and c.strip() != "/"]
+
+
+def build_work(row) -> dict:
+    """Decode a works+stats row into the API document shape."""
+    work = dict(row)
+
+    for key in JSON_COLUMNS:
+        val = work.get(key)
+        try:
+            work[key] = json.loads(val) if val else []
+        except Exception:
+            work[key] = []
+
+    work["cv"] = clean_cv(work["cv"])
+    if work["cv"]:
+        work["genres"].insert(0, f"{len(work['cv'])}cv")
+    work["affiliate_url"] = generate_affiliate_link(work)
+    work["thumbs"] = thumbnails.srcsets(work["rj_code"])
+    return {field: work.get(field) for field in ALL_FIELDS}
+
+
+def project(work: dict, fields: tuple[str, ...]) -> dict:
+    return {field: work.get(field) for field in fields}
+
+
+def encode(doc: dict) -> str:
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+
+
+def refresh_work_docs(conn, rj_codes: list[str] | None = None, chunk_size: int = 500) -> int:
+    """Rebuild the stored card/detail documents (all works when ``rj_codes`` is None)."""
+    if rj_codes is None:
+        batches = [conn.execute(SOURCE_QUERY).fetchall()]
+    else:
+        codes = list(rj_codes)
+        batches = (
+            conn.execute(
+                SOURCE_QUERY + f" WHERE w.rj_code IN ({', '.join('?' for _ in chunk)})", chunk
+            ).fetchall()
+            for chunk in (codes[i : i + chunk_size] for i in range(0, len(codes), chunk_size))
+        )
+
+    count = 0
+    for rows in batches:
+        docs = []
+        for row in rows:
+            doc = build_work(row)
+            docs.append((doc["rj_code"], encode(project(doc, CARD_FIELDS)), encode(doc)))
+        conn.executemany("INSERT OR REPLACE INTO work_docs (rj_code, card, doc) VALUES (?, ?, ?)", docs)
+        count += len(docs)
+    return count
@@ -0,0 +1,108 @@
+"""Shared HTTP client for the scraper.
+
+One ``requests.Session`` per host keeps connections alive across works (no new
+TCP+TLS handshake per fetch). Sessions are shared by the worker threads, so each
+adapter's pool is sized to the scrape concurrency. Transient failures (connect/read
+timeouts, 429 and 5xx) are retried with bounded exponential backoff; every retry takes
+a token from the host's rate limiter like the first attempt.
+"""
+
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from dlsite_app.config import settings
+from dlsite_app.services import replay
+from dlsite_app.services.ratelimit import throttle
+
+
+DEFAULT_HEADERS = {"User-Agent": "ASMR-Finder-Bot/1.0"}
+DEFAULT_TIMEOUT = 10
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions: dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+class ThrottledRetry(Retry):
+    """urllib3 retry policy that waits for the rate limiter before each retry."""
+
+    def __init__(self, *args, throttle_url: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.throttle_url = throttle_url
+
+    def new(self, **kw) -> "ThrottledRetry":
+        kw.setdefault("throttle_url", self.throttle_url)
+        return super().new(**kw)
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.throttle_url:
+            throttle(self.throttle_url)
+
+
+def _retry_policy(host: str | None = None) -> Retry:
+    # Retries go to the replay stub when replaying; the budget is still the real host's
+    return ThrottledRetry(
+        total=settings.http_retries,
+        connect=settings.http_retries,
+        read=settings.http_retries,
+        status=settings.http_retries,
+        backoff_factor=settings.http_backoff,
+        backoff_max=settings.http_backoff_max,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last response back; callers raise_for_status()
+        throttle_url=f"https://{host}/" if host else None,
+    )
+
+
+def _new_session(host: str | None = None) -> requests.Session:
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=max(1, settings.scrape_concurrency),
+        max_retries=_retry_policy(host),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """Pooled session for ``url``'s host (created on first use)."""
+    host = (urlparse(url).hostname or "").lower()
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _new_session(host)
+    return session
+
+
+def get(url: str, session: requests.Session | None = None, **kwargs) -> requests.Response:
+    """Rate-limited GET through the host's pooled session (or an explicit ``session``).
+
+    ``HTTP_REPLAY_URL`` sends the request to a replay stub instead of the real host and
+    ``HTTP_RECORD`` saves the response (see services.replay); rate limits and sessions
+    still follow the real host.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    throttle(url)
+    res = (session or get_session(url)).get(replay.rewrite(url), **kwargs)
+    if settings.http_record:
+        replay.record(requests.Request("GET", url, params=kwargs.get("params")).prepare().url, res)
+    return res
+
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,228 @@
+"""Parallel, content-addressed image downloads.
+
+Bodies are streamed to a ``.part`` file (hashing as they arrive), then renamed into
+``image_root/.blobs/<sha[:2]>/<sha><ext>``, so a sample image shared by many works is
+stored once. ``image_root/<rj_code>/`` keeps the familiar names (``main.jpg``,
+``sample_01.jpg``, ...) as links to the blobs, plus a ``manifest.json`` recording the
+URL, validators and blob of each name; ``.blobs/urls/`` maps each URL to its blob so
+other works reuse it without a request. An interrupted download resumes with a Range
+request; existing images are checked against the manifest instead of re-fetched.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+from dlsite_app.config import settings
+from dlsite_app.services import http_client
+from dlsite_app.services.page_cache import atomic_write
+
+
+BLOB_DIR = ".blobs"
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 64 * 1024
+
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _extension(url: str) -> str:
+    return Path(urlparse(url).path).suffix.lower() or ".jpg"
+
+
+def blob_path(image_root: Path, sha256: str, ext: str) -> Path:
+    return Path(image_root) / BLOB_DIR / sha256[:2] / f"{sha256}{ext}"
+
+
+def load_manifest(work_dir: Path) -> dict[str, dict]:
+    try:
+        return json.loads((work_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _lock_for(key: str) -> threading.Lock:
+    """Per-key lock: one writer per manifest, one download per URL (shared samples)."""
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def link_blob(blob: Path, dest: Path):
+    """Point ``dest`` at ``blob``: relative symlink, else hard link, else a copy."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.link")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.symlink(os.path.relpath(blob, dest.parent), tmp)
+    except (OSError, NotImplementedError):  # e.g. Windows without symlink rights
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)
+    os.replace(tmp, dest)
+
+
+def _url_index_path(image_root: Path, url: str) -> Path:
+    return Path(image_root) / BLOB_DIR / "urls" / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+
+def _known_blob(url: str, image_root: Path) -> dict | None:
+    """Entry of a URL another work already downloaded, if its blob is still there."""
+    try:
+        entry = json.loads(_url_index_path(image_root, url).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    blob = blob_path(image_root, entry["sha256"], entry["ext"])
+    return entry if blob.is_file() and blob.stat().st_size == entry.get("size") else None
+
+
+def _is_current(entry: dict | None, url: str, dest: Path, image_root: Path) -> bool:
+    """Cheap check: same URL, blob present with the recorded size, link in place."""
+    if not entry or entry.get("url") != url:
+        return False
+    blob = blob_path(image_root, entry["sha256"], entry.get("ext", _extension(url)))
+    try:
+        return blob.stat().st_size == entry.get("size") and dest.exists()
+    except OSError:
+        return False
+
+
+def _stream_to_blob(url: str, image_root: Path, entry: dict | None, revalidate: bool) -> dict | None:
+    """Download ``url`` into the blob store; returns its manifest entry (None on 304)."""
+    ext = _extension(url)
+    part = Path(image_root) / BLOB_DIR / "tmp" / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.part"
+    part.parent.mkdir(parents=True, exist_ok=True)
+
+    headers = {}
+    if revalidate and entry and entry.get("url") == url:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    offset = part.stat().st_size if part.exists() else 0
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+
+    with http_client.get(url, timeout=15, stream=True, headers=headers) as resp:
+        if resp.status_code == 304:
+            return None
+        if resp.status_code == 416:  # stale partial file
+            part.unlink(missing_ok=True)
+            return _stream_to_blob(url, image_root, entry, revalidate)
+        resp.raise_for_status()
+
+        digest = hashlib.sha256()
+        if resp.status_code == 206 and offset:
+            mode = "ab"
+            with part.open("rb") as existing:
+                for chunk in iter(lambda: existing.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+        else:
+            mode = "wb"  # server ignored the Range header
+        with part.open(mode) as f:
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+    sha256 = digest.hexdigest()
+    size = part.stat().st_size
+    blob = blob_path(image_root, sha256, ext)
+    if blob.exists():
+        part.unlink()
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(part, blob)
+    return {
+        "url": url,
+        "sha256": sha256,
+        "ext": ext,
+        "size": size,
+        "etag": etag,
+        "last_modified": last_modified,
+    }
+
+
+def _adopt_existing(url: str, dest: Path, image_root: Path) -> dict:
+    """Move a pre-blob-store image file into the store instead of downloading it again."""
+    digest = hashlib.sha256()
+    with dest.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    ext = _extension(url)
+    blob = blob_path(image_root, digest.hexdigest(), ext)
+    size = dest.stat().st_size
+    if blob.exists():
+        dest.unlink()
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(dest, blob)
+    return {"url": url, "sha256": digest.hexdigest(), "ext": ext, "size": size, "etag": None, "last_modified": None}
+
+
+def fetch_image(
+    url: str,
+    dest: Path,
+    image_root: Path | None = None,
+    revalidate: bool = False,
+) -> bool:
+    """Make ``dest`` a link to the blob of ``url``, downloading only when needed.
+
+    With ``revalidate=True`` images already present are confirmed with a conditional GET;
+    otherwise a matching manifest entry is trusted without touching the network.
+    """
+    image_root = Path(image_root or settings.image_root)
+    work_dir = dest.parent
+    entry = load_manifest(work_dir).get(dest.name)
+    if _is_current(entry, url, dest, image_root) and not revalidate:
+        return True
+    try:
+        if entry is None and dest.is_file() and not dest.is_symlink():
+            fresh = _adopt_existing(url, dest, image_root)
+        else:
+            with _lock_for(url):
+                shared = None if revalidate else _known_blob(url, image_root)
+                fresh = shared or _stream_to_blob(url, image_root, entry, revalidate)
+                if fresh is not None and fresh is not shared:
+                    atomic_write(_url_index_path(image_root, url), json.dumps(fresh).encode("utf-8"))
+    except Exception as exc:
+        print(f"Download failed {url}: {exc}")
+        return False
+    if fresh is None:  # 304: the blob we have is still current
+        if dest.exists():
+            return True
+        fresh = entry
+    link_blob(blob_path(image_root, fresh["sha256"], fresh["ext"]), dest)
+
+    with _lock_for(str(work_dir)):
+        manifest = load_manifest(work_dir)
+        manifest[dest.name] = fresh
+        atomic_write(
+            work_dir / MANIFEST_NAME,
+            json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8"),
+        )
+    return True
+
+
+def download_all(
+    jobs: list[tuple[str, Path]],
+    image_root: Path | None = None,
+    workers: int | None = None,
+    revalidate: bool = False,
+) -> int:
+    """Fetch ``(url, dest)`` pairs on a thread pool; returns how many succeeded.
+
+    Per-host politeness still comes from the shared rate limiter in http_client.
+    """
+    if not jobs:
+        return 0
+    workers = max(1, workers or settings.image_concurrency)
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        results = pool.map(lambda job: fetch_image(job[0], job[1], image_root, revalidate), jobs)
+        return sum(1 for ok in results if ok)
@@ -1,83 +1,269 @@
+import hashlib
 import json
 from datetime import datetime
 from pathlib import Path
 
 from dlsite_app.config import settings
-from dlsite_app.db import get_db_connection
+from dlsite_app.db import bump_catalog_version, get_db_connection
+from dlsite_app.services.documents import clean_cv, refresh_work_docs
+from dlsite_app.services.migrations import migrate, table_exists
 
 
-def ingest_json_files(data_dir: str | Path | None = None):
+STATS_UPSERT = """
+    INSERT OR REPLACE INTO stats (
+        rj_code, dl_count, wishlist_count, price,
+        rate_average, rate_count_detail, affiliate_deny, last_updated
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def replace_work_tags(conn, rj_code: str, genres: list | None, cv: list | None):
+    """Rewrite the work_genres/work_cv rows of one work."""
+    conn.execute("DELETE FROM work_genres WHERE rj_code = ?", (rj_code,))
+    conn.execute("DELETE FROM work_cv WHERE rj_code = ?", (rj_code,))
+    genre_names = [g.strip() for g in genres or [] if isinstance(g, str) and g.strip()]
+    conn.executemany(
+        "INSERT OR IGNORE INTO work_genres (rj_code, genre, genre_key, position) VALUES (?, ?, ?, ?)",
+        [(rj_code, name, name.lower(), pos) for pos, name in enumerate(genre_names)],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO work_cv (rj_code, cv, cv_key, position) VALUES (?, ?, ?, ?)",
+        [(rj_code, name, name.lower(), pos) for pos, name in enumerate(clean_cv(cv))],
+    )
+
+
+def replace_work_fts(conn, rj_code: str, static: dict):
+    """Rewrite the works_fts row of one work from its static info."""
+    conn.execute("DELETE FROM works_fts WHERE rj_code = ?", (rj_code,))
+    conn.execute(
+        "INSERT INTO works_fts (rj_code, title, circle, cv, genres, description) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            rj_code,
+            static.get("title") or "",
+            static.get("circle") or "",
+            " ".join(clean_cv(static.get("cv"))),
+            " ".join(g for g in static.get("genres") or [] if isinstance(g, str)),
+            static.get("description") or "",
+        ),
+    )
+
+
+def _work_row(rj_code: str, static: dict, dynamic: dict, now: datetime | None) -> tuple:
+    return (
+        rj_code,
+        dynamic.get("site_id", "maniax"),
+        static.get("title"),
+        static.get("circle"),
+        static["circle"].lower() if isinstance(static.get("circle"), str) else None,
+        static.get("release_date"),
+        static.get("description"),
+        dynamic.get("work_image") if dynamic else None,
+        json.dumps(static.get("media", []), ensure_ascii=False),
+        json.dumps(static.get("embeds", []), ensure_ascii=False),
+        static.get("chobit_url"),
+        json.dumps(static.get("genres", []), ensure_ascii=False),
+        json.dumps(static.get("cv", []), ensure_ascii=False),
+        json.dumps(static.get("content_tokens", []), ensure_ascii=False),
+        static.get("file_size"),
+        now,
+    )
+
+
+def _stats_row(rj_code: str, dynamic: dict, now: datetime) -> tuple:
+    return (
+        rj_code,
+        dynamic.get("dl_count", 0),
+        dynamic.get("wishlist_count", 0),
+        dynamic.get("price", 0),
+        dynamic.get("rate_average_2dp", 0.0),
+        json.dumps(dynamic.get("rate_count_detail", []), ensure_ascii=False),
+        dynamic.get("affiliate_deny", 0),
+        now,
+    )
+
+
+def _scraped_at(data: dict, key: str, default: datetime) -> datetime | None:
+    """Scrape time stored in a record; ``default`` for records written before it existed.
+
+    An explicit null (static page fetch failed) stays None, so the work counts as stale.
+    """
+    if key not in data:
+        return default
+    ts = data[key]
+    return datetime.fromtimestamp(ts) if isinstance(ts, (int, float)) else None
+
+
+def upsert_records(conn, records: list[dict]) -> list[str]:
+    """Write scraped records (the RJxxx.json shape) and everything derived from them.
+
+    Runs inside the caller's transaction: works/stats rows go in with executemany, then
+    the tag tables, FTS rows and pre-encoded documents of the same works are rebuilt.
+    ``works.updated_at`` / ``stats.last_updated`` record when the static page / the
+    stats were scraped (not when they were ingested), for the refresh scheduler.
+    Returns the rj_codes written.
+    """
+    now = datetime.now()
+    work_rows, stats_rows, statics = [], [], {}
+    for data in records:
+        rj_code = data.get("rj_code")
+        if not rj_code:
+            continue
+        static = data.get("static_info", {}) or {}
+        dynamic = data.get("dynamic_info", {}) or {}
+        scraped_at = _scraped_at(data, "scraped_at_ts", now) or now
+        static_at = _scraped_at(data, "static_scraped_at_ts", scraped_at)
+        work_rows.append(_work_row(rj_code, static, dynamic, static_at))
+        if dynamic:
+            stats_rows.append(_stats_row(rj_code, dynamic, scraped_at))
+        statics[rj_code] = static
+
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO works (
+            rj_code, site_id, title, circle, circle_key, release_date, description,
+            img_url, media, embeds, chobit_url, genres, cv, content_tokens, file_size, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        work_rows,
+    )
+    conn.executemany(
+        STATS_UPSERT,
+        stats_rows,
+    )
+
+    has_fts = table_exists(conn, "works_fts")
+    for rj_code, static in statics.items():
+        replace_work_tags(conn, rj_code, static.get("genres"), static.get("cv"))
+        if has_fts:
+            replace_work_fts(conn, rj_code, static)
+    refresh_work_docs(conn, list(statics))
+    return list(statics)
+
+
+def refresh_affiliate_links(conn) -> bool:
+    """Rebuild every stored document if AFFILIATE_ID changed since they were built.
+
+    ``affiliate_url`` is baked into work_docs; meta remembers the id it was built with.
+    Runs inside the caller's transaction; returns whether the documents were rebuilt.
+    """
+    row = conn.execute("SELECT value FROM meta WHERE key = 'affiliate_id'").fetchone()
+    if row and row[0] == settings.affiliate_id:
+        return False
+    refresh_work_docs(conn)
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('affiliate_id', ?)", (settings.affiliate_id,))
+    return True
+
+
+def update_dynamic_records(conn, fresh: dict[str, dict]) -> list[str]:
+    """Stats-only counterpart of :func:`upsert_records` for works already in the DB.
+
+    Runs inside the caller's transaction. ``works.updated_at`` is left alone: it tracks
+    the static page. Returns the rj_codes updated.
+    """
+    if not fresh:
+        return []
+    codes = list(fresh)
+    known = set()
+    for i in range(0, len(codes), 500):
+        chunk = codes[i : i + 500]
+        rows = conn.execute(
+            f"SELECT rj_code FROM works WHERE rj_code IN ({', '.join('?' for _ in chunk)})", chunk
+        ).fetchall()
+        known.update(row[0] for row in rows)
+    targets = [code for code in codes if code in known and fresh[code]]
+
+    now = datetime.now()
+    conn.executemany(
+        "UPDATE works SET img_url = COALESCE(?, img_url) WHERE rj_code = ?",
+        [(fresh[code].get("work_image"), code) for code in targets],
+    )
+    conn.executemany(
+        STATS_UPSERT,
+        [_stats_row(code, fresh[code], now) for code in targets],
+    )
+    refresh_work_docs(conn, targets)
+    return targets
+
+
+def _manifest(conn) -> dict[str, tuple[int, int, str]]:
+    rows = conn.execute("SELECT path, mtime_ns, size, sha256 FROM ingest_manifest").fetchall()
+    return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+
+def ingest_json_files(data_dir: str | Path | None = None, force: bool = False) -> dict[str, int]:
+    """Ingest new or changed RJ*.json files in one WAL transaction.
+
+    The ingest_manifest table remembers (mtime, size, sha256) per file: files whose
+    mtime and size are unchanged are skipped without being read, and files that were
+    touched but hash the same are only re-stamped. ``force`` re-ingests everything.
+    Returns a summary report.
+    """
     data_dir = Path(data_dir or settings.data_dir)
     data_dir.mkdir(parents=True, exist_ok=True)
     conn = get_db_connection()
-    cursor = conn.cursor()
+    migrate(conn)
 
     json_files = sorted(data_dir.glob("RJ*.json"))
-    print(f"Found {len(json_files)} JSON files in {data_dir}.")
+    manifest = {} if force else _manifest(conn)
+    report = {"files": len(json_files), "unchanged": 0, "ingested": 0, "invalid": 0, "errors": 0}
+    records: list[dict] = []
+    manifest_rows: list[tuple] = []
 
     for filepath in json_files:
+        path = str(filepath.resolve())
         try:
-            with filepath.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            rj_code = data.get("rj_code")
-            static = data.get("static_info", {}) or {}
-            dynamic = data.get("dynamic_info", {}) or {}
-
+            stat = filepath.stat()
+            known = manifest.get(path)
+            if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+                report["unchanged"] += 1
+                continue
+            raw = filepath.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if known and known[2] == digest:
+                report["unchanged"] += 1
+                manifest_rows.append((path, stat.st_mtime_ns, stat.st_size, digest, None))
+                continue
+            data = json.loads(raw)
+            rj_code = data.get("rj_code") if isinstance(data, dict) else None
             if not rj_code:
+                report["invalid"] += 1
                 continue
-
-            print(f"Ingesting {rj_code}...")
-
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO works (
-                    rj_code, site_id, title, circle, release_date, description,
-                    img_url, media, embeds, chobit_url, genres, cv, content_tokens, file_size, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    rj_code,
-                    dynamic.get("site_id", "maniax"),
-                    static.get("title"),
-                    static.get("circle"),
-                    static.get("release_date"),
-                    static.get("description"),
-                    dynamic.get("work_image") if dynamic else None,
-                    json.dumps(static.get("media", []), ensure_ascii=False),
-                    json.dumps(static.get("embeds", []), ensure_ascii=False),
-                    static.get("chobit_url"),
-                    json.dumps(static.get("genres", []), ensure_ascii=False),
-                    json.dumps(static.get("cv", []), ensure_ascii=False),
-                    json.dumps(static.get("content_tokens", []), ensure_ascii=False),
-                    static.get("file_size"),
-                    datetime.now(),
-                ),
-            )
-
-            if dynamic:
-                cursor.execute(
-                    """
-                    INSERT OR REPLACE INTO stats (
-                        rj_code, dl_count, wishlist_count, price,
-                        rate_average, rate_count_detail, affiliate_deny, last_updated
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        rj_code,
-                        dynamic.get("dl_count", 0),
-                        dynamic.get("wishlist_count", 0),
-                        dynamic.get("price", 0),
-                        dynamic.get("rate_average_2dp", 0.0),
-                        json.dumps(dynamic.get("rate_count_detail", []), ensure_ascii=False),
-                        dynamic.get("affiliate_deny", 0),
-                        datetime.now(),
-                    ),
-                )
-
+            records.append(data)
+            manifest_rows.append((path, stat.st_mtime_ns, stat.st_size, digest, rj_code))
         except Exception as exc:
+            report["errors"] += 1
             print(f"Error processing {filepath}: {exc}")
 
-    conn.commit()
-    conn.close()
-    print("Ingestion complete.")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        written = upsert_records(conn, records)
+        relinked = refresh_affiliate_links(conn)
+        conn.executemany(
+            """
+            INSERT INTO ingest_manifest (path, mtime_ns, size, sha256, rj_code, ingested_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(path) DO UPDATE SET
+                mtime_ns = excluded.mtime_ns,
+                size = excluded.size,
+                sha256 = excluded.sha256,
+                rj_code = COALESCE(excluded.rj_code, ingest_manifest.rj_code),
+                ingested_at = CASE WHEN excluded.rj_code IS NULL
+                    THEN ingest_manifest.ingested_at ELSE excluded.ingested_at END
+            """,
+            manifest_rows,
+        )
+        if written or relinked:
+            bump_catalog_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    report["ingested"] = len(written)
+    print(
+        "Ingestion complete: {ingested} ingested, {unchanged} unchanged, "
+        "{invalid} invalid, {errors} error(s) out of {files} file(s).".format(**report)
+    )
+    return report
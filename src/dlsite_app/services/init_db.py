@@ -1,49 +1,12 @@
 from dlsite_app.db import get_db_connection
+from dlsite_app.services.migrations import migrate
 
 
 def init_db():
+    """Create or upgrade the schema in place; existing data is kept."""
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("DROP TABLE IF EXISTS works")
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS works (
-            rj_code TEXT PRIMARY KEY,
-            site_id TEXT,
-            title TEXT,
-            circle TEXT,
-            release_date TEXT,
-        description TEXT,
-        img_url TEXT,
-        media TEXT,
-        embeds TEXT,
-        chobit_url TEXT,
-        genres TEXT,
-        cv TEXT,
-        content_tokens TEXT,
-        file_size TEXT,
-        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """
-    )
-
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS stats (
-            rj_code TEXT PRIMARY KEY,
-            dl_count INTEGER,
-            wishlist_count INTEGER,
-            price INTEGER,
-            rate_average REAL,
-            rate_count_detail TEXT,
-            affiliate_deny INTEGER,
-            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (rj_code) REFERENCES works (rj_code)
-        )
-        """
-    )
-
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully.")
+    try:
+        version = migrate(conn)
+    finally:
+        conn.close()
+    print(f"Database initialized successfully (schema version {version}).")
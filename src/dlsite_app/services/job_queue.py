@@ -0,0 +1,359 @@
+"""Durable scrape job queue (SQLite ``scrape_jobs`` table).
+
+One row per (rj_code, kind). ``kind`` is ``new`` (first, chobit-only scrape of a code
+from New_Code.txt) or ``update`` (refresh of a tracked work from Update_Code.txt).
+
+States: ``pending`` -> ``running`` (leased by one worker) -> ``done``; a failed attempt
+goes back to ``pending`` with an exponential ``next_run_at`` backoff, and becomes
+``failed`` after JOB_MAX_ATTEMPTS. Workers claim jobs in a ``BEGIN IMMEDIATE``
+transaction, so any number of threads and processes can drain the same queue; a
+lease that expires (worker crashed) makes the job claimable again. Every finished job
+is committed as it completes, so a crashed run resumes exactly where it stopped.
+
+The code text files remain the editable lists of codes: :func:`import_codes` syncs a
+file into the queue (codes removed from the file drop their jobs) and
+:func:`export_codes` writes the queue back.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from dlsite_app.config import settings
+from dlsite_app.db import get_db_connection
+from dlsite_app.services.migrations import migrate
+
+
+KINDS = ("new", "update")
+STATES = ("pending", "running", "done", "failed")
+
+
+def connect() -> sqlite3.Connection:
+    conn = get_db_connection()
+    migrate(conn)
+    return conn
+
+
+def worker_id() -> str:
+    """``host:pid:thread``, recorded as the lease owner."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue(
+    conn,
+    rj_codes: list[str],
+    kind: str,
+    priority: int = 0,
+    requeue: bool = False,
+) -> int:
+    """Add jobs (existing ones are left alone unless ``requeue``); returns rows added or reset."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown job kind {kind!r}; expected one of {', '.join(KINDS)}")
+    now = time.time()
+    on_conflict = (
+        """DO UPDATE SET state = 'pending', attempts = 0,
+               next_run_at = excluded.next_run_at, last_error = NULL, updated_at = excluded.updated_at
+           WHERE scrape_jobs.state IN ('done', 'failed')"""
+        if requeue
+        else "DO NOTHING"
+    )
+    with conn:
+        before = conn.total_changes
+        conn.executemany(
+            f"""
+            INSERT INTO scrape_jobs (rj_code, kind, priority, next_run_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(rj_code, kind) {on_conflict}
+            """,
+            [(code, kind, priority, now, now, now) for code in dict.fromkeys(rj_codes)],
+        )
+        return conn.total_changes - before
+
+
+def claim(conn, kind: str, owner: str, limit: int = 1, lease_seconds: float | None = None) -> list[str]:
+    """Lease up to ``limit`` ready jobs (highest priority, then longest waiting) to ``owner``."""
+    now = time.time()
+    lease = lease_seconds or settings.job_lease_seconds
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Leases that ran out on their last allowed attempt: the worker died every time
+        conn.execute(
+            """
+            UPDATE scrape_jobs SET state = 'failed', lease_owner = NULL, lease_expires_at = NULL,
+                last_error = 'lease expired', updated_at = ?
+            WHERE kind = ? AND state = 'running' AND lease_expires_at < ? AND attempts >= ?
+            """,
+            (now, kind, now, settings.job_max_attempts),
+        )
+        codes = [
+            row[0]
+            for row in conn.execute(
+                """
+                SELECT rj_code FROM scrape_jobs
+                WHERE kind = ?
+                  AND ((state = 'pending' AND next_run_at <= ?) OR (state = 'running' AND lease_expires_at < ?))
+                ORDER BY priority DESC, next_run_at, rj_code
+                LIMIT ?
+                """,
+                (kind, now, now, limit),
+            )
+        ]
+        conn.executemany(
+            """
+            UPDATE scrape_jobs SET state = 'running', lease_owner = ?, lease_expires_at = ?,
+                attempts = attempts + 1, updated_at = ?
+            WHERE rj_code = ? AND kind = ?
+            """,
+            [(owner, now + lease, now, code, kind) for code in codes],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return codes
+
+
+def complete(conn, rj_code: str, kind: str, owner: str):
+    with conn:
+        conn.execute(
+            """
+            UPDATE scrape_jobs SET state = 'done', lease_owner = NULL, lease_expires_at = NULL,
+                last_error = NULL, updated_at = ?
+            WHERE rj_code = ? AND kind = ? AND lease_owner = ?
+            """,
+            (time.time(), rj_code, kind, owner),
+        )
+
+
+def fail(conn, rj_code: str, kind: str, owner: str, error: str):
+    """Back off exponentially before the next attempt; give up after JOB_MAX_ATTEMPTS."""
+    now = time.time()
+    with conn:
+        row = conn.execute(
+            "SELECT attempts FROM scrape_jobs WHERE rj_code = ? AND kind = ? AND lease_owner = ?",
+            (rj_code, kind, owner),
+        ).fetchone()
+        if row is None:  # lease lost to another worker
+            return
+        attempts = row[0]
+        delay = min(settings.job_retry_backoff * 2 ** max(0, attempts - 1), settings.job_retry_backoff_max)
+        conn.execute(
+            """
+            UPDATE scrape_jobs SET state = ?, next_run_at = ?, lease_owner = NULL, lease_expires_at = NULL,
+                last_error = ?, updated_at = ?
+            WHERE rj_code = ? AND kind = ? AND lease_owner = ?
+            """,
+            (
+                "failed" if attempts >= settings.job_max_attempts else "pending",
+                now + delay,
+                error[:500],
+                now,
+                rj_code,
+                kind,
+                owner,
+            ),
+        )
+
+
+def counts(conn, kind: str) -> dict[str, int]:
+    """Jobs of ``kind`` per state (every state present, zeros included)."""
+    out = dict.fromkeys(STATES, 0)
+    for state, count in conn.execute(
+        "SELECT state, COUNT(*) FROM scrape_jobs WHERE kind = ? GROUP BY state", (kind,)
+    ):
+        out[state] = count
+    return out
+
+
+def codes(conn, kind: str, states: tuple[str, ...] = STATES) -> list[str]:
+    placeholders = ",".join("?" for _ in states)
+    return [
+        row[0]
+        for row in conn.execute(
+            f"SELECT rj_code FROM scrape_jobs WHERE kind = ? AND state IN ({placeholders}) ORDER BY rj_code",
+            (kind, *states),
+        )
+    ]
+
+
+def _round_key(kind: str) -> str:
+    return f"scrape_round:{kind}"
+
+
+def begin_round(conn, kind: str) -> int:
+    """Start a pass over every job of ``kind`` unless one is still open (a crashed run).
+
+    Every job that is not running goes back to ``pending`` with no attempts, so a job
+    backing off from the last round is tried again right away. Returns how many jobs
+    were reset.
+    """
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (_round_key(kind),)).fetchone()
+    if row and row[0] == "open":
+        return 0
+    with conn:
+        requeued = conn.execute(
+            """
+            UPDATE scrape_jobs SET state = 'pending', attempts = 0, next_run_at = 0, last_error = NULL,
+                updated_at = ?
+            WHERE kind = ? AND state != 'running'
+            """,
+            (time.time(), kind),
+        ).rowcount
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, 'open')", (_round_key(kind),))
+    return requeued
+
+
+def end_round(conn, kind: str) -> bool:
+    """Close the pass once every job was attempted in it; returns whether it closed.
+
+    Jobs that failed and are backing off count as attempted (they are retried in the
+    next round), so one failing work cannot hold the round open.
+    """
+    unattempted = conn.execute(
+        """
+        SELECT COUNT(*) FROM scrape_jobs
+        WHERE kind = ? AND (state = 'running' OR (state = 'pending' AND attempts = 0))
+        """,
+        (kind,),
+    ).fetchone()[0]
+    if unattempted:
+        return False
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, 'closed')", (_round_key(kind),))
+    return True
+
+
+def drain(
+    kind: str,
+    run: Callable[[str], bool],
+    workers: int | None = None,
+    limit: int | None = None,
+    then: str | None = None,
+) -> dict[str, bool]:
+    """Run ``run(rj_code)`` over ready jobs of ``kind`` on ``workers`` threads.
+
+    Each thread claims one job at a time on its own connection and records the outcome
+    before claiming the next, until no job is ready (jobs backing off after a failure
+    wait for a later run) or ``limit`` jobs have been claimed. A successful job also
+    enqueues a job of kind ``then`` for the same code. Returns ``{rj_code: ok}``.
+    """
+    workers = max(1, workers or settings.scrape_concurrency)
+    results: dict[str, bool] = {}
+    lock = threading.Lock()
+    claimed = 0
+
+    def take(conn, owner) -> str | None:
+        nonlocal claimed
+        with lock:
+            if limit is not None and claimed >= limit:
+                return None
+            got = claim(conn, kind, owner)
+            claimed += len(got)
+        return got[0] if got else None
+
+    def worker():
+        owner = worker_id()
+        conn = get_db_connection()
+        try:
+            while (code := take(conn, owner)) is not None:
+                try:
+                    ok, error = run(code), "scrape failed"
+                except Exception as exc:
+                    ok, error = False, f"{type(exc).__name__}: {exc}"
+                if ok:
+                    complete(conn, code, kind, owner)
+                    if then:
+                        enqueue(conn, [code], then)
+                else:
+                    fail(conn, code, kind, owner, error)
+                with lock:
+                    results[code] = ok
+                    print(f"[{len(results)}] {kind} {code}: {'ok' if ok else 'failed'}")
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(worker) for _ in range(workers)]:
+            future.result()
+    return results
+
+
+def read_code_file(path: Path) -> list[str]:
+    """RJ codes of a New_Code.txt / Update_Code.txt style file (one per line)."""
+    if not path.exists():
+        return []
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip().startswith("RJ")]
+
+
+def write_code_file(path: Path, rj_codes: list[str]):
+    uniq = sorted(set(rj_codes))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(uniq) + ("\n" if uniq else ""), encoding="utf-8")
+
+
+def drop_unlisted(conn, path: Path, kind: str) -> int:
+    """Delete ``kind`` jobs whose code was removed from the text file; returns how many.
+
+    Only jobs created before the file was last written count as removed (a job another
+    run added since is simply not exported yet), and running jobs are left to finish.
+    A missing file removes nothing.
+    """
+    try:
+        written_at = path.stat().st_mtime
+    except OSError:
+        return 0
+    listed = set(read_code_file(path))
+    stale = [
+        row[0]
+        for row in conn.execute(
+            "SELECT rj_code FROM scrape_jobs WHERE kind = ? AND state != 'running' AND created_at < ?",
+            (kind, written_at),
+        )
+        if row[0] not in listed
+    ]
+    with conn:
+        conn.executemany("DELETE FROM scrape_jobs WHERE rj_code = ? AND kind = ?", [(code, kind) for code in stale])
+    return len(stale)
+
+
+def import_codes(conn, path: Path, kind: str, priority: int = 0) -> int:
+    """Sync a text file into the ``kind`` jobs; returns jobs added.
+
+    Codes in the file are enqueued (``new`` skips codes already tracked for updates) and
+    jobs whose code was deleted from the file are dropped (:func:`drop_unlisted`), so
+    removing a line from Update_Code.txt stops refreshing that work.
+    """
+    removed = drop_unlisted(conn, path, kind)
+    if removed:
+        print(f"Dropped {removed} {kind} job(s) no longer listed in {path.name}")
+    found = read_code_file(path)
+    if kind == "new":
+        tracked = set(codes(conn, "update"))
+        found = [code for code in found if code not in tracked]
+    return enqueue(conn, found, kind, priority=priority)
+
+
+def export_codes(conn, path: Path, kind: str, states: tuple[str, ...] = STATES) -> int:
+    """Write the codes of ``kind`` jobs in ``states`` to a text file; returns how many."""
+    found = codes(conn, kind, states)
+    write_code_file(path, found)
+    return len(found)
+
+
+def prune_tracked_new(conn) -> int:
+    """Drop unfinished ``new`` jobs for codes that are already tracked for updates."""
+    with conn:
+        cur = conn.execute(
+            """
+            DELETE FROM scrape_jobs
+            WHERE kind = 'new' AND state != 'done'
+              AND rj_code IN (SELECT rj_code FROM scrape_jobs WHERE kind = 'update')
+            """
+        )
+        return cur.rowcount
@@ -0,0 +1,273 @@
+"""Versioned, additive schema migrations tracked in ``PRAGMA user_version``.
+
+Each migration runs once, inside its own transaction, and must never drop data:
+upgrading a production database only ever adds tables, columns and indexes.
+"""
+
+import json
+import sqlite3
+from typing import Callable
+
+
+def _m001_base_tables(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS works (
+            rj_code TEXT PRIMARY KEY,
+            site_id TEXT,
+            title TEXT,
+            circle TEXT,
+            release_date TEXT,
+            description TEXT,
+            img_url TEXT,
+            media TEXT,
+            embeds TEXT,
+            chobit_url TEXT,
+            genres TEXT,
+            cv TEXT,
+            content_tokens TEXT,
+            file_size TEXT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stats (
+            rj_code TEXT PRIMARY KEY,
+            dl_count INTEGER,
+            wishlist_count INTEGER,
+            price INTEGER,
+            rate_average REAL,
+            rate_count_detail TEXT,
+            affiliate_deny INTEGER,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (rj_code) REFERENCES works (rj_code)
+        )
+        """
+    )
+
+
+def _m002_tag_tables_and_indexes(conn: sqlite3.Connection):
+    from dlsite_app.services.documents import clean_cv
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS work_genres (
+            rj_code TEXT NOT NULL,
+            genre TEXT NOT NULL COLLATE NOCASE,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (rj_code, genre)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS work_cv (
+            rj_code TEXT NOT NULL,
+            cv TEXT NOT NULL COLLATE NOCASE,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (rj_code, cv)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_work_genres_genre ON work_genres (genre, rj_code)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_work_cv_cv ON work_cv (cv, rj_code)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_works_circle ON works (circle COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_works_release_date ON works (release_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_dl_count ON stats (dl_count)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_price ON stats (price)")
+
+    # Backfill from the JSON text columns of existing rows (the columns of this version
+    # only: ingest.replace_work_tags writes the ones later migrations add)
+    for rj_code, genres, cv in conn.execute("SELECT rj_code, genres, cv FROM works").fetchall():
+        try:
+            genre_list = json.loads(genres) if genres else []
+            cv_list = json.loads(cv) if cv else []
+        except ValueError:
+            continue
+        genre_names = [g.strip() for g in genre_list if isinstance(g, str) and g.strip()]
+        conn.executemany(
+            "INSERT OR IGNORE INTO work_genres (rj_code, genre, position) VALUES (?, ?, ?)",
+            [(rj_code, name, pos) for pos, name in enumerate(genre_names)],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO work_cv (rj_code, cv, position) VALUES (?, ?, ?)",
+            [(rj_code, name, pos) for pos, name in enumerate(clean_cv(cv_list))],
+        )
+
+
+def _m003_works_fts(conn: sqlite3.Connection):
+    from dlsite_app.services.ingest import replace_work_fts
+
+    # trigram (SQLite 3.34+) gives substring matching for Japanese text, which has no
+    # word boundaries for unicode61 to split on. Builds without FTS5 simply skip search.
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5(
+                    rj_code, title, circle, cv, genres, description, tokenize='{tokenizer}'
+                )
+                """
+            )
+            break
+        except sqlite3.OperationalError as exc:
+            print(f"FTS5 tokenizer '{tokenizer}' unavailable: {exc}")
+    if not table_exists(conn, "works_fts"):
+        return
+
+    rows = conn.execute("SELECT rj_code, title, circle, cv, genres, description FROM works").fetchall()
+    for rj_code, title, circle, cv, genres, description in rows:
+        try:
+            cv_list = json.loads(cv) if cv else []
+            genre_list = json.loads(genres) if genres else []
+        except ValueError:
+            cv_list, genre_list = [], []
+        replace_work_fts(
+            conn,
+            rj_code,
+            {"title": title, "circle": circle, "cv": cv_list, "genres": genre_list, "description": description},
+        )
+
+
+def _m004_meta(conn: sqlite3.Connection):
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('catalog_version', '1')")
+
+
+def _m005_work_docs(conn: sqlite3.Connection):
+    from dlsite_app.services.documents import refresh_work_docs
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS work_docs (
+            rj_code TEXT PRIMARY KEY,
+            card TEXT NOT NULL,
+            doc TEXT NOT NULL
+        )
+        """
+    )
+    refresh_work_docs(conn)
+
+
+def _m006_ingest_manifest(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ingest_manifest (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            rj_code TEXT,
+            ingested_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _m007_docs_with_thumbs(conn: sqlite3.Connection):
+    from dlsite_app.db import bump_catalog_version
+    from dlsite_app.services.documents import refresh_work_docs
+
+    # Documents gained a "thumbs" field (card srcsets)
+    refresh_work_docs(conn)
+    bump_catalog_version(conn)
+
+
+def _m008_chobit_cache(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chobit_cache (
+            rj_code TEXT PRIMARY KEY,
+            chobit_url TEXT,
+            strategy TEXT,
+            checked_at REAL NOT NULL
+        )
+        """
+    )
+
+
+def _m009_scrape_jobs(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            rj_code TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',
+            priority INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_run_at REAL NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (rj_code, kind)
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_scrape_jobs_ready "
+        "ON scrape_jobs(kind, state, priority DESC, next_run_at)"
+    )
+
+
+def _m010_match_keys(conn: sqlite3.Connection):
+    # Exact tag filters compare Python-lowercased keys: COLLATE NOCASE only folds ASCII
+    conn.create_function("py_lower", 1, lambda value: value.lower() if isinstance(value, str) else value)
+    for table, source, key in (
+        ("work_genres", "genre", "genre_key"),
+        ("work_cv", "cv", "cv_key"),
+        ("works", "circle", "circle_key"),
+    ):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if key not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {key} TEXT")
+        conn.execute(f"UPDATE {table} SET {key} = py_lower({source})")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_work_genres_key ON work_genres (genre_key, rj_code)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_work_cv_key ON work_cv (cv_key, rj_code)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_works_circle_key ON works (circle_key)")
+
+
+# (version, description, apply). Append only; never edit a released migration.
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base works/stats tables", _m001_base_tables),
+    (2, "genre/cv junction tables and lookup indexes", _m002_tag_tables_and_indexes),
+    (3, "works_fts full-text index", _m003_works_fts),
+    (4, "meta table with catalog_version", _m004_meta),
+    (5, "pre-encoded work_docs", _m005_work_docs),
+    (6, "ingest_manifest for incremental ingest", _m006_ingest_manifest),
+    (7, "rebuild work_docs with thumbnail srcsets", _m007_docs_with_thumbs),
+    (8, "chobit_cache for embed fallback lookups", _m008_chobit_cache),
+    (9, "scrape_jobs queue", _m009_scrape_jobs),
+    (10, "lowercased genre/cv/circle match keys", _m010_match_keys),
+]
+
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations in order and return the resulting schema version."""
+    current = schema_version(conn)
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"Applying migration {version:03d}: {description}")
+        conn.execute("BEGIN")
+        try:
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {version:d}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+    return current
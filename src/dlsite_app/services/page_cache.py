@@ -0,0 +1,182 @@
+"""On-disk raw HTTP response cache with conditional revalidation.
+
+Every cached URL keeps its body plus ``ETag``/``Last-Modified`` under
+``settings.cache_dir / "http"``. Revalidation sends ``If-None-Match`` /
+``If-Modified-Since``; on a 304 (or an identical body) callers can reuse what they
+parsed last time via :func:`load_parsed`. ``HTTP_CACHE_MODE=offline`` replays a scrape
+entirely from the cache, ``off`` bypasses it.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+from dlsite_app.config import settings
+from dlsite_app.services import http_client
+
+
+CACHE_MODES = ("revalidate", "offline", "off")
+
+
+@dataclass
+class CachedPage:
+    """Response-like view of a cached or freshly fetched body."""
+
+    url: str
+    status_code: int
+    content: bytes
+    key: str = ""
+    etag: str | None = None
+    last_modified: str | None = None
+    sha256: str = ""
+    fetched_at: float = 0.0
+    not_modified: bool = False  # served from cache after a 304 (or offline)
+    changed: bool = True  # body differs from the previously cached copy
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def cache_key(url: str, params: dict | None = None) -> tuple[str, str]:
+    """Return ``(full_url, key)`` for a URL plus query params."""
+    full_url = requests.Request("GET", url, params=params).prepare().url
+    return full_url, hashlib.sha256(full_url.encode("utf-8")).hexdigest()
+
+
+def _entry_dir(key: str) -> Path:
+    return settings.cache_dir / "http" / key[:2]
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write via a temp file in the same directory + rename, so readers never see a torn file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; exported files must stay world-readable
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def load_entry(key: str) -> CachedPage | None:
+    meta_path = _entry_dir(key) / f"{key}.json"
+    body_path = _entry_dir(key) / f"{key}.body"
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        content = body_path.read_bytes()
+    except (OSError, ValueError):
+        return None
+    return CachedPage(
+        url=meta["url"],
+        status_code=meta.get("status_code", 200),
+        content=content,
+        key=key,
+        etag=meta.get("etag"),
+        last_modified=meta.get("last_modified"),
+        sha256=meta.get("sha256", ""),
+        fetched_at=meta.get("fetched_at", 0.0),
+    )
+
+
+def store_entry(key: str, page: CachedPage):
+    directory = _entry_dir(key)
+    atomic_write(directory / f"{key}.body", page.content)
+    meta = {
+        "url": page.url,
+        "status_code": page.status_code,
+        "etag": page.etag,
+        "last_modified": page.last_modified,
+        "sha256": page.sha256,
+        "fetched_at": page.fetched_at,
+    }
+    atomic_write(directory / f"{key}.json", json.dumps(meta).encode("utf-8"))
+
+
+def fetch(
+    url: str,
+    params: dict | None = None,
+    headers: dict | None = None,
+    session: requests.Session | None = None,
+    mode: str | None = None,
+    **kwargs,
+) -> CachedPage:
+    """GET ``url`` through the cache; raises ``requests.RequestException`` like requests does."""
+    mode = mode or settings.http_cache_mode
+    full_url, key = cache_key(url, params)
+    cached = load_entry(key) if mode != "off" else None
+
+    if mode == "offline":
+        if cached is None:
+            raise requests.ConnectionError(f"Offline cache miss: {full_url}")
+        cached.not_modified, cached.changed = True, False
+        return cached
+
+    request_headers = dict(headers or {})
+    if cached is not None:
+        if cached.etag:
+            request_headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            request_headers["If-Modified-Since"] = cached.last_modified
+
+    res = http_client.get(url, session=session, params=params, headers=request_headers, **kwargs)
+    if res.status_code == 304 and cached is not None:
+        cached.not_modified, cached.changed = True, False
+        return cached
+
+    page = CachedPage(
+        url=full_url,
+        status_code=res.status_code,
+        content=res.content,
+        key=key,
+        etag=res.headers.get("ETag"),
+        last_modified=res.headers.get("Last-Modified"),
+        sha256=hashlib.sha256(res.content).hexdigest(),
+        fetched_at=time.time(),
+    )
+    page.changed = cached is None or cached.sha256 != page.sha256
+    if mode != "off" and res.ok:
+        store_entry(key, page)
+    return page
+
+
+def load_parsed(page: CachedPage, parser_version: int) -> dict | None:
+    """Parsed result stored for this exact body and parser version, if any."""
+    if page.changed or not page.key:
+        return None
+    key = page.key
+    try:
+        stored = json.loads((_entry_dir(key) / f"{key}.parsed.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if stored.get("sha256") != page.sha256 or stored.get("parser_version") != parser_version:
+        return None
+    return stored.get("data")
+
+
+def store_parsed(page: CachedPage, parser_version: int, data: dict):
+    if not page.key or settings.http_cache_mode == "off":
+        return
+    key = page.key
+    payload = {"sha256": page.sha256, "parser_version": parser_version, "data": data}
+    atomic_write(_entry_dir(key) / f"{key}.parsed.json", json.dumps(payload, ensure_ascii=False).encode("utf-8"))
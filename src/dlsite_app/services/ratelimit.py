@@ -0,0 +1,65 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+from dlsite_app.config import settings
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, up to ``burst`` saved up.
+
+    Callers reserve a token under the lock and sleep outside it, so concurrent
+    workers queue up fairly instead of all waking at once.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """One token bucket per host group, matched by domain suffix."""
+
+    def __init__(self, rates: dict[str, float], default_rate: float = 0.0):
+        self._buckets = {suffix: TokenBucket(rate) for suffix, rate in rates.items()}
+        self._default = TokenBucket(default_rate)
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = (urlparse(url).hostname or "").lower()
+        for suffix, bucket in self._buckets.items():
+            if host == suffix or host.endswith("." + suffix):
+                return bucket
+        return self._default
+
+    def wait(self, url: str):
+        self.bucket_for(url).acquire()
+
+
+rate_limiter = HostRateLimiter(
+    {
+        "dlsite.com": settings.rate_limit_dlsite,
+        "chobit.cc": settings.rate_limit_chobit,
+        "dlsite.jp": settings.rate_limit_images,  # img.dlsite.jp CDN
+    },
+    default_rate=settings.rate_limit_images,
+)
+
+
+def throttle(url: str):
+    """Block until the politeness budget for ``url``'s host allows another request."""
+    rate_limiter.wait(url)
@@ -0,0 +1,187 @@
+"""Staleness-tiered refresh planning for tracked works.
+
+Stats (DL count, price, rating) move fast on new or popular works and hardly at all on
+old ones, while the static page (description, tags, chobit embed) rarely changes. So
+each work gets a stats interval from its tier (release age, or downloads per day for
+works that keep selling) and the static page a much longer one. ``stats.last_updated``
+and ``works.updated_at`` say when each part was last scraped; the most overdue works
+come first, and a run stops at its request budget.
+
+Request costs: a batched stats refresh costs one request per ``DYNAMIC_BATCH_SIZE``
+works; a static refresh (``save_work_to_json``: page + stats, chobit fallbacks cached)
+is counted as :data:`STATIC_REQUEST_COST` requests.
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from dlsite_app.config import settings
+from dlsite_app.services.scraper import refresh_dynamic_data, scrape_many
+from dlsite_app.services.sinks import make_sink
+
+
+# (released within this many days, stats refresh interval in hours); first match wins
+DYNAMIC_TIERS = (
+    (30, 6),
+    (180, 24),
+    (730, 24 * 7),
+    (None, 24 * 30),
+)
+# Works still selling this many downloads a day keep the daily interval however old
+FAST_MOVING_DL_PER_DAY = 5
+FAST_MOVING_INTERVAL_HOURS = 24
+STATIC_REQUEST_COST = 2
+MODES = ("both", "static", "dynamic")
+
+_DATE_RE = re.compile(r"(\d{4})\D+(\d{1,2})\D+(\d{1,2})")
+
+
+def parse_release_date(value: str | None) -> datetime | None:
+    """``2024年01月02日`` / ``2024-01-02`` / ``2024/01/02`` -> datetime."""
+    match = _DATE_RE.search(value or "")
+    if not match:
+        return None
+    try:
+        return datetime(*(int(part) for part in match.groups()))
+    except ValueError:
+        return None
+
+
+def _parse_timestamp(value) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def dynamic_interval_hours(release: datetime | None, dl_count: int | None, now: datetime) -> float:
+    if release is None:  # unknown age: treat as new until the static page tells otherwise
+        return DYNAMIC_TIERS[0][1]
+    age_days = max(1.0, (now - release).total_seconds() / 86400)
+    for max_age, hours in DYNAMIC_TIERS:
+        if max_age is None or age_days <= max_age:
+            break
+    if (dl_count or 0) / age_days >= FAST_MOVING_DL_PER_DAY:
+        hours = min(hours, FAST_MOVING_INTERVAL_HOURS)
+    return hours
+
+
+@dataclass
+class RefreshPlan:
+    """Works to refresh in one run, most overdue first."""
+
+    static: list[str] = field(default_factory=list)
+    dynamic: list[str] = field(default_factory=list)
+    due_static: int = 0
+    due_dynamic: int = 0
+    budget: int | None = None
+
+    @property
+    def requests(self) -> int:
+        """Estimated requests: static refreshes plus batched stats calls."""
+        batch = max(1, settings.dynamic_batch_size)
+        return len(self.static) * STATIC_REQUEST_COST + math.ceil(len(self.dynamic) / batch)
+
+    def summary(self) -> str:
+        return (
+            f"static {len(self.static)}/{self.due_static} due, stats {len(self.dynamic)}/{self.due_dynamic} due, "
+            f"~{self.requests} request(s)" + (f" of {self.budget}" if self.budget is not None else "")
+        )
+
+
+def plan_refresh(
+    conn,
+    rj_codes: list[str],
+    mode: str = "both",
+    budget: int | None = None,
+    now: datetime | None = None,
+) -> RefreshPlan:
+    """Pick which of ``rj_codes`` to refresh now.
+
+    ``mode`` limits the run to static pages or stats. With a ``budget`` (requests),
+    static refreshes may use up to REFRESH_STATIC_SHARE of it, stats refreshes take the
+    rest; works missing from the DB count as static refreshes due since forever. Works
+    due for both only need the static refresh (it scrapes the stats as well).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown refresh mode {mode!r}; expected one of {', '.join(MODES)}")
+    now = now or datetime.now()
+    budget = settings.refresh_budget if budget is None else budget
+    budget = budget if budget and budget > 0 else None
+    wanted = list(dict.fromkeys(rj_codes))
+
+    rows = {}
+    for i in range(0, len(wanted), 500):
+        chunk = wanted[i : i + 500]
+        for row in conn.execute(
+            f"""
+            SELECT w.rj_code, w.release_date, w.updated_at, s.last_updated, s.dl_count
+            FROM works w LEFT JOIN stats s ON s.rj_code = w.rj_code
+            WHERE w.rj_code IN ({', '.join('?' for _ in chunk)})
+            """,
+            chunk,
+        ):
+            rows[row[0]] = row
+
+    static_interval = settings.static_refresh_days * 86400
+    static_due: list[tuple[float, str]] = []
+    dynamic_due: list[tuple[float, str]] = []
+    for code in wanted:
+        row = rows.get(code)
+        if row is None:
+            static_due.append((math.inf, code))
+            continue
+        static_at = _parse_timestamp(row[2])
+        overdue = math.inf if static_at is None else (now - static_at).total_seconds() / static_interval
+        if overdue >= 1:
+            static_due.append((overdue, code))
+        stats_at = _parse_timestamp(row[3])
+        interval = dynamic_interval_hours(parse_release_date(row[1]), row[4], now) * 3600
+        overdue = math.inf if stats_at is None else (now - stats_at).total_seconds() / interval
+        if overdue >= 1:
+            dynamic_due.append((overdue, code))
+
+    # Most overdue first (ties: lowest code, for stable plans)
+    static_due.sort(key=lambda item: (-item[0], item[1]))
+    dynamic_due.sort(key=lambda item: (-item[0], item[1]))
+    plan = RefreshPlan(due_static=len(static_due), due_dynamic=len(dynamic_due), budget=budget)
+
+    if mode in ("both", "static"):
+        share = budget if mode == "static" or budget is None else int(budget * settings.refresh_static_share)
+        limit = len(static_due) if share is None else share // STATIC_REQUEST_COST
+        plan.static = [code for _, code in static_due[:limit]]
+    if mode in ("both", "dynamic"):
+        # A static refresh scrapes the stats too
+        scraped = set(plan.static)
+        dynamic_due = [item for item in dynamic_due if item[1] not in scraped]
+        if budget is None:
+            plan.dynamic = [code for _, code in dynamic_due]
+        else:
+            # Whatever the static refreshes left, in whole batches
+            remaining = budget - len(plan.static) * STATIC_REQUEST_COST
+            limit = max(0, remaining) * max(1, settings.dynamic_batch_size)
+            plan.dynamic = [code for _, code in dynamic_due[:limit]]
+    if mode == "both" and budget is not None:
+        # Budget the stats did not need goes back to static refreshes (which cover the
+        # stats of their work, so the batch can only shrink)
+        planned = set(plan.static)
+        for _, code in static_due:
+            if code in planned:
+                continue
+            extra = RefreshPlan(static=plan.static + [code], dynamic=[c for c in plan.dynamic if c != code])
+            if extra.requests > budget:
+                break
+            plan.static, plan.dynamic = extra.static, extra.dynamic
+    return plan
+
+
+def run_plan(plan: RefreshPlan, sink=None, workers: int | None = None) -> dict[str, int]:
+    """Carry out a plan: full scrapes for static refreshes, batched calls for stats."""
+    sink = sink or make_sink()
+    scraped = scrape_many(plan.static, workers=workers, download_media=False, sink=sink) if plan.static else {}
+    refreshed = refresh_dynamic_data(plan.dynamic, sink=sink) if plan.dynamic else []
+    return {"static": sum(1 for ok in scraped.values() if ok), "dynamic": len(refreshed)}
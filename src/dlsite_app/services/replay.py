@@ -0,0 +1,243 @@
+"""Record scraper traffic and replay it from a local stub server.
+
+With ``HTTP_RECORD=<name>`` every successful GET made through http_client is saved
+under ``cache_dir/replay/<name>/`` (one ``<key>.body`` + ``<key>.json`` per URL, the
+same layout as the page cache). :class:`ReplayServer` serves such a recording over
+HTTP: product pages, product/info/ajax JSON, chobit search/work pages and images. With
+``HTTP_REPLAY_URL`` pointing at it, http_client sends every request there instead of
+the real host, so scrapes and benchmarks run offline through the normal code path
+(sessions, retries, conditional GETs, Range requests).
+
+Requests are mapped onto the stub as ``<replay_url>/<scheme>/<host><path>?<query>``.
+"""
+
+import hashlib
+import json
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse, urlsplit, urlunsplit
+
+import requests
+
+from dlsite_app.config import settings
+
+
+DYNAMIC_INFO_PATH = "/maniax/product/info/ajax"
+
+
+def recording_dir(name: str | None = None) -> Path:
+    return settings.cache_dir / "replay" / (name or settings.http_record or "default")
+
+
+def _key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def rewrite(url: str, replay_url: str | None = None) -> str:
+    """``https://host/path?q`` -> ``<replay_url>/https/host/path?q`` (unchanged if not replaying)."""
+    replay_url = (replay_url or settings.http_replay_url).rstrip("/")
+    parts = urlsplit(url)
+    if not replay_url or not parts.netloc:
+        return url
+    return f"{replay_url}/{parts.scheme}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+def original_url(path: str) -> str | None:
+    """Inverse of :func:`rewrite` for the path (with query) a stub request arrived on."""
+    scheme, _, rest = path.lstrip("/").partition("/")
+    if scheme not in ("http", "https") or not rest:
+        return None
+    return f"{scheme}://{rest}"
+
+
+def record(url: str, res: requests.Response, name: str | None = None):
+    """Save the response to ``url`` (the full URL with query, as on the real host).
+
+    Only 200s are kept: 304 and 206 bodies are not whole pages.
+    """
+    from dlsite_app.services.page_cache import atomic_write
+
+    if res.status_code != 200:
+        return
+    key = _key(url)
+    directory = recording_dir(name) / key[:2]
+    atomic_write(directory / f"{key}.body", res.content)
+    meta = {
+        "url": url,
+        "status_code": res.status_code,
+        "content_type": res.headers.get("Content-Type"),
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(res.content).hexdigest(),
+    }
+    atomic_write(directory / f"{key}.json", json.dumps(meta).encode("utf-8"))
+
+
+def import_page_cache(name: str | None = None, cache_root: Path | None = None) -> int:
+    """Copy the raw page cache (``cache_dir/http``) into a recording; returns entries copied.
+
+    Pages scraped earlier become replayable without another pass over the live site.
+    """
+    source = Path(cache_root or settings.cache_dir / "http")
+    target = recording_dir(name)
+    copied = 0
+    for meta_path in source.glob("*/*.json"):
+        if meta_path.name.endswith(".parsed.json"):
+            continue
+        body = meta_path.with_suffix(".body")
+        if not body.exists():
+            continue
+        dest = target / meta_path.parent.name
+        dest.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(meta_path, dest / meta_path.name)
+        shutil.copyfile(body, dest / body.name)
+        copied += 1
+    return copied
+
+
+class Recording:
+    """Read side of a recording directory."""
+
+    def __init__(self, name: str | None = None, root: Path | None = None):
+        self.root = Path(root or recording_dir(name))
+
+    def load(self, url: str) -> tuple[dict, bytes] | None:
+        directory = self.root / _key(url)[:2]
+        try:
+            meta = json.loads((directory / f"{_key(url)}.json").read_text(encoding="utf-8"))
+            return meta, (directory / f"{_key(url)}.body").read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def urls(self) -> list[str]:
+        out = []
+        for meta_path in self.root.glob("*/*.json"):
+            try:
+                out.append(json.loads(meta_path.read_text(encoding="utf-8"))["url"])
+            except (OSError, ValueError, KeyError):
+                continue
+        return sorted(out)
+
+    def product_codes(self) -> list[str]:
+        """RJ codes whose product page is in the recording."""
+        codes = []
+        for url in self.urls():
+            path = urlparse(url).path
+            if "/work/=/product_id/" in path:
+                codes.append(path.rsplit("/", 1)[-1].removesuffix(".html"))
+        return sorted(set(codes))
+
+    def merged_dynamic(self, url: str) -> bytes | None:
+        """Answer a batched product/info/ajax call from single-product recordings."""
+        parts = urlsplit(url)
+        if parts.path != DYNAMIC_INFO_PATH:
+            return None
+        query = parse_qs(parts.query)
+        codes = ",".join(query.get("product_id", [])).split(",")
+        if len(codes) < 2:
+            return None
+        merged = {}
+        for code in codes:
+            single = {**query, "product_id": [code]}
+            found = self.load(urlunsplit(parts._replace(query=urlencode(single, doseq=True))))
+            if found:
+                try:
+                    merged.update(json.loads(found[1]))
+                except ValueError:
+                    continue
+        return json.dumps(merged).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ReplayServer"
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real hosts
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            if value:
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = original_url(self.path)
+        found = self.server.recording.load(url) if url else None
+        if found is None and url:
+            merged = self.server.recording.merged_dynamic(url)
+            if merged is not None:
+                found = ({"content_type": "application/json"}, merged)
+        if found is None:
+            self.server.count("miss")
+            self._send(404, b"not recorded", {"Content-Type": "text/plain"})
+            return
+        meta, body = found
+        etag = meta.get("etag") or f'"{meta.get("sha256") or hashlib.sha256(body).hexdigest()}"'
+        headers = {
+            "Content-Type": meta.get("content_type") or "application/octet-stream",
+            "ETag": etag,
+            "Last-Modified": meta.get("last_modified"),
+            "Accept-Ranges": "bytes",
+        }
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("not_modified")
+            self._send(304, b"", {"ETag": etag})
+            return
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes=") and range_header.endswith("-"):
+            start = int(range_header[6:-1] or 0)
+            if start >= len(body):
+                self._send(416, b"", {"Content-Range": f"bytes */{len(body)}"})
+                return
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            self.server.count("partial")
+            self._send(206, body[start:], headers)
+            return
+        self.server.count("hit")
+        self._send(200, body, headers)
+
+    do_HEAD = do_GET
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Threaded stub HTTP server for a recording; ``port=0`` picks a free port."""
+
+    daemon_threads = True
+
+    def __init__(self, recording: Recording, host: str = "127.0.0.1", port: int = 0, verbose: bool = False):
+        super().__init__((host, port), _Handler)
+        self.recording = recording
+        self.verbose = verbose
+        self.stats = {"hit": 0, "not_modified": 0, "partial": 0, "miss": 0}
+        self._stats_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, outcome: str):
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    def start(self) -> "ReplayServer":
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
@@ -0,0 +1,48 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Bounded LRU of encoded response bodies keyed by catalog version and request.
+
+    Entries are never stale: a new catalog version simply stops matching old keys,
+    and older versions are evicted as soon as a newer one is stored.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._version: str | None = None
+        self._lock = threading.Lock()
+
+    def get(self, version: str, key) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry is not None:
+                self._entries.move_to_end((version, key))
+            return entry
+
+    def put(self, version: str, key, body: bytes) -> CachedResponse:
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        entry = CachedResponse(body=body, etag=f"{version}-{digest}")
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._entries[(version, key)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
@@ -1,15 +1,18 @@
 import json
-import random
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse, urljoin
 import html as html_std
 
 import requests
-from lxml import html
+from lxml import etree, html
 
 from dlsite_app.config import settings
+from dlsite_app.services import chobit_cache, images, page_cache, thumbnails
+from dlsite_app.services.sinks import make_sink
 
 
 def _with_affiliate_id(raw_url: str | None) -> str | None:
@@ -54,66 +57,46 @@ def _normalize_url(url: str | None) -> str | None:
     return url
 
 
-def _download_file(url: str, dest: Path):
-    try:
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        resp = requests.get(url, timeout=15)
-        resp.raise_for_status()
-        dest.write_bytes(resp.content)
-        return True
-    except Exception as exc:
-        print(f"Download failed {url}: {exc}")
-        return False
+def _unique_urls(urls: list[str], skip: set[str] | None = None) -> list[str]:
+    out = []
+    for u in urls:
+        nu = _normalize_url(u)
+        if nu and nu not in out and nu not in (skip or ()):
+            out.append(nu)
+    return out
 
 
 def download_images(
-    rj_code: str, main_url: str | None, sample_urls: list[str], image_root: Path, desc_urls: list[str] | None = None
-):
-    """Download main and sample images into images/{rj_code}/.
+    rj_code: str,
+    main_url: str | None,
+    sample_urls: list[str],
+    image_root: Path,
+    desc_urls: list[str] | None = None,
+    revalidate: bool = False,
+) -> int:
+    """Download main and sample images into images/{rj_code}/ (see services.images).
 
     desc_urls: optional list of description images; saved as desc_XX.ext for reference.
+    Files are fetched in parallel into the shared blob store and card thumbnails are made
+    from the main image; returns how many images are in place.
     """
     norm_main = _normalize_url(main_url)
-    norm_samples = []
-    for u in sample_urls:
-        nu = _normalize_url(u)
-        if not nu:
-            continue
-        if nu == norm_main:
-            # Skip if identical to main to reduce duplicate fetches
-            continue
-        if nu in norm_samples:
-            continue
-        norm_samples.append(nu)
+    # Skip samples identical to main to reduce duplicate fetches
+    norm_samples = _unique_urls(sample_urls, {norm_main} if norm_main else None)
+    norm_desc = _unique_urls(desc_urls or [])
+
     base_dir = Path(image_root) / rj_code
+    jobs = []
     if norm_main:
-        ext = Path(urlparse(norm_main).path).suffix or ".jpg"
-        dest = base_dir / f"main{ext}"
-        if not dest.exists():  # avoid re-downloading if already cached
-            _download_file(norm_main, dest)
-    for idx, url in enumerate(norm_samples, start=1):
-        ext = Path(urlparse(url).path).suffix or ".jpg"
-        dest = base_dir / f"sample_{idx:02d}{ext}"
-        if dest.exists():
-            continue
-        _download_file(url, dest)
-
-    # Description images (kept separate names to distinguish source)
-    if desc_urls:
-        norm_desc = []
-        for u in desc_urls:
-            nu = _normalize_url(u)
-            if not nu:
-                continue
-            if nu in norm_desc:
-                continue
-            norm_desc.append(nu)
-        for idx, url in enumerate(norm_desc, start=1):
+        jobs.append((norm_main, base_dir / f"main{Path(urlparse(norm_main).path).suffix or '.jpg'}"))
+    for prefix, urls in (("sample", norm_samples), ("desc", norm_desc)):
+        for idx, url in enumerate(urls, start=1):
             ext = Path(urlparse(url).path).suffix or ".jpg"
-            dest = base_dir / f"desc_{idx:02d}{ext}"
-            if dest.exists():
-                continue
-            _download_file(url, dest)
+            jobs.append((url, base_dir / f"{prefix}_{idx:02d}{ext}"))
+    count = images.download_all(jobs, image_root=image_root, revalidate=revalidate)
+    if norm_main:
+        thumbnails.make_thumbnails(rj_code, image_root)
+    return count
 
 
 def _extract_chobit_embed(tree: html.HtmlElement, raw_text: str) -> str | None:
@@ -140,60 +123,111 @@ def _extract_chobit_embed(tree: html.HtmlElement, raw_text: str) -> str | None:
     return None
 
 
-def fetch_chobit_via_search(rj_code: str) -> str | None:
-    """Search on chobit.cc by RJ code and pick the embed iframe src."""
+def _search_chobit(rj_code: str) -> str | None:
+    """Chobit search strategy; request failures raise (unlike :func:`fetch_chobit_via_search`)."""
     search_url = "https://chobit.cc/s/"
     params = {"f_category": "all", "q_keyword": rj_code}
-    headers = {"User-Agent": "ASMR-Finder-Bot/1.0"}
+    res = page_cache.fetch(search_url, params=params)
+    res.raise_for_status()
+
+    # If redirected to a work page directly, res.url will not be /s/
+    tree = html.fromstring(res.content)
+    found = _extract_chobit_embed(tree, res.text)
+    if found:
+        return found
+
+    # If still on search results, try to follow the first work link
+    links = tree.xpath("//a[@href and not(contains(@href,'/s/'))]/@href")
+    work_links: list[str] = []
+    for href in links:
+        # heuristics: simple path like /abcd or /abc123
+        if re.match(r"^/[A-Za-z0-9]{4,}$", href):
+            work_links.append(href)
+    if work_links:
+        work_url = urljoin("https://chobit.cc", work_links[0])
+        work_res = page_cache.fetch(work_url)
+        work_res.raise_for_status()
+        work_tree = html.fromstring(work_res.content)
+        return _extract_chobit_embed(work_tree, work_res.text)
+    return None
+
+
+def fetch_chobit_via_search(rj_code: str) -> str | None:
+    """Search on chobit.cc by RJ code and pick the embed iframe src."""
     try:
-        res = requests.get(search_url, params=params, headers=headers, timeout=10)
-        res.raise_for_status()
+        return _search_chobit(rj_code)
+    except Exception as exc:
+        print(f"[{rj_code}] Chobit search fetch error: {exc}")
+        return None
+
+
+def _affiliate_chobit(rj_code: str) -> str | None:
+    """Affiliate tool page strategy: the page embeds a ready-made chobit player tag."""
+    aff_url = f"https://www.dlsite.com/maniax/dlaf/tool/=/work_id/{rj_code}"
+    aff_res = page_cache.fetch(aff_url, headers={"Cookie": "adult_checked=1"})
+    if aff_res.status_code == 404:  # no affiliate page for this work: a real "none"
+        return None
+    aff_res.raise_for_status()
+    raw_from_aff = _find_chobit_url(aff_res.text)
+    return _with_affiliate_id(raw_from_aff) if raw_from_aff else None
+
+
+def resolve_chobit_fallback(rj_code: str) -> str | None:
+    """Find the chobit embed of a work whose product page has none (see services.chobit_cache).
 
-        # If redirected to a work page directly, res.url will not be /s/
-        tree = html.fromstring(res.content)
-        found = _extract_chobit_embed(tree, res.text)
+    A fresh cached result answers without any request. Otherwise the enabled
+    strategies run, the last successful one first; the outcome is cached unless a
+    strategy failed with a request error (a miss is only cached when every strategy
+    really answered "no embed").
+    """
+    strategies = []
+    if settings.enable_chobit_affiliate_fallback:
+        strategies.append(("affiliate", _affiliate_chobit))
+    if settings.enable_chobit_search:
+        strategies.append(("search", _search_chobit))
+    if not strategies:
+        return None
+
+    cached = chobit_cache.lookup(rj_code)
+    if cached and chobit_cache.is_fresh(cached):
+        return cached["chobit_url"]
+    if cached and cached["strategy"]:
+        strategies.sort(key=lambda item: item[0] != cached["strategy"])
+
+    errors = False
+    for name, strategy in strategies:
+        try:
+            found = strategy(rj_code)
+        except Exception as exc:
+            print(f"[{rj_code}] Chobit {name} fallback error: {exc}")
+            errors = True
+            continue
         if found:
+            chobit_cache.store(rj_code, found, name)
             return found
+    if not errors:
+        chobit_cache.store(rj_code, None, None)
+    return None
 
-        # If still on search results, try to follow the first work link
-        links = tree.xpath("//a[@href and not(contains(@href,'/s/'))]/@href")
-        work_links: list[str] = []
-        for href in links:
-            # heuristics: simple path like /abcd or /abc123
-            if re.match(r"^/[A-Za-z0-9]{4,}$", href):
-                work_links.append(href)
-        if work_links:
-            work_url = urljoin("https://chobit.cc", work_links[0])
-            try:
-                work_res = requests.get(work_url, headers=headers, timeout=10)
-                work_res.raise_for_status()
-                work_tree = html.fromstring(work_res.content)
-                found_work = _extract_chobit_embed(work_tree, work_res.text)
-                if found_work:
-                    return found_work
-            except Exception as inner_exc:
-                print(f"[{rj_code}] Chobit work fetch error: {inner_exc}")
 
-        return None
-    except Exception as exc:
-        print(f"[{rj_code}] Chobit search fetch error: {exc}")
-        return None
+DYNAMIC_INFO_URL = "https://www.dlsite.com/maniax/product/info/ajax"
+
+
+def _dynamic_headers(referer: str) -> dict[str, str]:
+    return {
+        "Referer": referer,
+        "X-Requested-With": "XMLHttpRequest",
+    }
 
 
 def fetch_dynamic_data(rj_code: str, session: requests.Session | None = None):
     """Fetch dynamic metadata (DL count, price, etc.) via the AJAX endpoint."""
-    client = session or requests
-    url = "https://www.dlsite.com/maniax/product/info/ajax"
+    url = DYNAMIC_INFO_URL
     params = {"product_id": rj_code, "cdn_cache_min": 1}
-    headers = {
-        "User-Agent": "ASMR-Finder-Bot/1.0",
-        "Referer": f"https://www.dlsite.com/maniax/work/=/product_id/{rj_code}.html",
-        "X-Requested-With": "XMLHttpRequest",
-    }
+    headers = _dynamic_headers(f"https://www.dlsite.com/maniax/work/=/product_id/{rj_code}.html")
 
     try:
-        time.sleep(random.uniform(1, 3))
-        res = client.get(url, params=params, headers=headers, timeout=10)
+        res = page_cache.fetch(url, session=session, params=params, headers=headers)
         res.raise_for_status()
         work_data = res.json().get(rj_code)
         return work_data
@@ -202,140 +236,235 @@ def fetch_dynamic_data(rj_code: str, session: requests.Session | None = None):
         return None
 
 
+def fetch_dynamic_data_batch(
+    rj_codes: list[str],
+    chunk_size: int | None = None,
+    session: requests.Session | None = None,
+) -> dict[str, dict | None]:
+    """Fetch dynamic metadata for many works, ``chunk_size`` product ids per request.
+
+    The AJAX endpoint accepts a comma-separated ``product_id`` and answers with a dict
+    keyed by product id. A chunk whose request fails is retried one code at a time
+    with :func:`fetch_dynamic_data`. Codes missing from the response map to None.
+    """
+    chunk_size = max(1, chunk_size or settings.dynamic_batch_size)
+    codes = list(dict.fromkeys(rj_codes))
+    results: dict[str, dict | None] = {}
+
+    for start in range(0, len(codes), chunk_size):
+        chunk = codes[start : start + chunk_size]
+        params = {"product_id": ",".join(chunk), "cdn_cache_min": 1}
+        try:
+            res = page_cache.fetch(
+                DYNAMIC_INFO_URL,
+                session=session,
+                params=params,
+                headers=_dynamic_headers("https://www.dlsite.com/maniax/"),
+                timeout=15,
+            )
+            res.raise_for_status()
+            payload = res.json()
+            if not isinstance(payload, dict):
+                raise ValueError(f"unexpected payload type {type(payload).__name__}")
+        except Exception as exc:
+            print(f"Batch dynamic fetch failed for {len(chunk)} code(s), retrying singly: {exc}")
+            for code in chunk:
+                results[code] = fetch_dynamic_data(code, session=session)
+            continue
+        for code in chunk:
+            results[code] = payload.get(code)
+    return results
+
+
+STATIC_PARSER_VERSION = 1  # bump when parse_static_page output changes
+
+
+# Compiled once; parse_static_page() runs for every scraped product page
+_XP_TITLE = etree.XPath("//h1[@id='work_name']/text()")
+_XP_CIRCLE = etree.XPath("//span[@class='maker_name']//a/text()")
+_XP_DESC = etree.XPath("/html/body/div[3]/div[4]/div[1]/div/div[3]")
+_XP_DESC_FALLBACK = etree.XPath("//div[contains(@class, 'work_parts_container')]")
+_XP_OUTLINE_ROWS = etree.XPath("//table[@id='work_outline']//tr[th]")
+_XP_GENRES = etree.XPath("//div[@class='main_genre']//a/text()")
+_XP_CHOBIT_IFRAME = etree.XPath("//iframe[contains(@src, 'chobit.cc')]/@src")
+_XP_SLIDER = etree.XPath("//div[@id='product_slider_data'] | //div[contains(@class, 'product-slider-data')]")
+_XP_SLIDER_ITEMS = etree.XPath(".//div[@data-src]")
+_XP_SAMPLE_FALLBACK = etree.XPath("/html/body/div[3]/div[4]/div[1]/div/div[1]/div[1]//img")
+
+
+def _text_nodes(elem) -> list[str]:
+    """The element's own text() nodes: its text plus the tails of its children."""
+    nodes = [elem.text] if elem.text is not None else []
+    nodes.extend(child.tail for child in elem if child.tail is not None)
+    return nodes
+
+
+def parse_outline(tree) -> list[tuple[list[str], dict[str, list[str]]]]:
+    """Read ``#work_outline`` once into ``(labels, values)`` rows.
+
+    ``labels`` are the first text node of each header cell (what ``contains(text(), ...)``
+    matched on); ``values`` holds the raw text nodes of the row's ``td`` ("td"),
+    ``td/a`` ("a") and ``td/div`` ("div") children.
+    """
+    rows = []
+    for tr in _XP_OUTLINE_ROWS(tree):
+        labels: list[str] = []
+        values: dict[str, list[str]] = {"a": [], "td": [], "div": []}
+        for cell in tr:
+            if cell.tag == "th":
+                texts = _text_nodes(cell)
+                if texts:
+                    labels.append(texts[0])
+            elif cell.tag == "td":
+                values["td"].extend(_text_nodes(cell))
+                for child in cell:
+                    if child.tag in ("a", "div"):
+                        values[child.tag].extend(_text_nodes(child))
+        rows.append((labels, values))
+    return rows
+
+
+def _outline_values(outline, label: str, kind: str) -> list[str]:
+    return [
+        v
+        for labels, values in outline
+        if any(label in text for text in labels)
+        for v in values[kind]
+    ]
+
+
+def _outline_texts(outline, label: str) -> list[str]:
+    """Link texts of the rows labelled ``label``, else their plain cell text; stripped."""
+    values = _outline_values(outline, label, "a") or _outline_values(outline, label, "td")
+    return [v.strip() for v in values if v and v.strip()]
+
+
+def _description(desc_root) -> tuple[str, list[str], list[dict]]:
+    """Description text, image URLs and content tokens of the description block.
+
+    Tokens and images come from one walk of the subtree (each element's text, then its
+    tail, in the order the detail view renders them); the plain text stays itertext(),
+    which walks in C and keeps tails after their element's children.
+    """
+    images: list[str] = []
+    tokens: list[dict] = []
+    for elem in desc_root.iter():
+        if elem.text and elem.text.strip():
+            tokens.append({"type": "text", "content": elem.text})
+        if elem.tag == "img":
+            src = elem.get("src") or elem.get("data-src")
+            if src:
+                if elem is not desc_root:
+                    images.append(src)
+                tokens.append({"type": "image", "url": "https:" + src if src.startswith("//") else src})
+        if elem.tail and elem.tail.strip():
+            tokens.append({"type": "text", "content": elem.tail})
+    return "\n".join(desc_root.itertext()).strip(), images, tokens
+
+
+def _uniq_urls(urls: list[str]) -> list[str]:
+    seen = set()
+    out = []
+    for u in urls:
+        if not u:
+            continue
+        if u.startswith("//"):
+            u = "https:" + u
+        if u in seen:
+            continue
+        seen.add(u)
+        out.append(u)
+    return out
+
+
+def parse_static_page(content: bytes, text: str | None = None) -> dict:
+    """Parse a product page into static metadata (no network access)."""
+    text = content.decode("utf-8", errors="replace") if text is None else text
+    tree = html.fromstring(content)
+
+    data: dict[str, str | list[str] | None] = {}
+
+    title = _XP_TITLE(tree)
+    data["title"] = title[0] if title else None
+
+    circle = _XP_CIRCLE(tree)
+    data["circle"] = circle[0] if circle else None
+
+    desc_section = _XP_DESC(tree) or _XP_DESC_FALLBACK(tree)
+    desc_images: list[str] = []
+    if desc_section:
+        data["description"], desc_images, data["content_tokens"] = _description(desc_section[0])
+    else:
+        data["description"], data["content_tokens"] = None, []
+
+    outline = parse_outline(tree)
+    release_date = _outline_texts(outline, "販売日")
+    data["release_date"] = release_date[0] if release_date else None
+    data["cv"] = _outline_texts(outline, "声優")
+    data["age_limit"] = _outline_texts(outline, "年齢指定")
+    data["work_type"] = _outline_texts(outline, "作品形式")
+    data["file_format"] = _outline_texts(outline, "ファイル形式")
+    data["genres"] = _XP_GENRES(tree)
+
+    file_size = _outline_values(outline, "ファイル容量", "div")
+    data["file_size"] = file_size[0].strip() if file_size else None
+
+    # Chobit Integration (main page iframe -> fallback to any chobit URL)
+    data["chobit_url"] = None
+    chobit_iframe = _XP_CHOBIT_IFRAME(tree)
+    if chobit_iframe:
+        data["chobit_url"] = _with_affiliate_id(chobit_iframe[0])
+    if not data["chobit_url"]:
+        raw_from_body = _find_chobit_url(text)
+        if raw_from_body:
+            data["chobit_url"] = _with_affiliate_id(raw_from_body)
+
+    # Media (sample images) from slider (preferred) or fallback path
+    sample_urls: list[str] = []
+    slider_data = _XP_SLIDER(tree)
+    if slider_data:
+        for div in _XP_SLIDER_ITEMS(slider_data[0]):
+            src = div.get("data-src")
+            if src:
+                sample_urls.append(src)
+    # Explicit fallback path provided by user
+    for img in _XP_SAMPLE_FALLBACK(tree):
+        src = img.get("data-src") or img.get("src")
+        if src:
+            sample_urls.append(src)
+
+    sample_urls = _uniq_urls(sample_urls)
+    desc_images = _uniq_urls(desc_images)
+    # Avoid downloading the same file twice across sample/desc
+    sample_set = set(sample_urls)
+    desc_images = [u for u in desc_images if u not in sample_set]
+
+    data["media"] = sample_urls
+    data["desc_images"] = desc_images
+
+    return data
+
+
 def fetch_static_data(rj_code: str):
-    """Fetch static metadata (title, circle, genres, description, etc.)."""
+    """Fetch static metadata (title, circle, genres, description, etc.).
+
+    The page goes through the conditional-GET cache; when DLsite answers 304 or the
+    body is byte-identical, the previous parse is reused instead of re-parsing.
+    """
     url = f"https://www.dlsite.com/maniax/work/=/product_id/{rj_code}.html"
-    headers = {
-        "User-Agent": "ASMR-Finder-Bot/1.0",
-        "Cookie": "adult_checked=1",  # age gate
-    }
+    headers = {"Cookie": "adult_checked=1"}  # age gate
 
     try:
-        res = requests.get(url, headers=headers, timeout=10)
+        res = page_cache.fetch(url, headers=headers)
         res.raise_for_status()
-        tree = html.fromstring(res.content)
-
-        data: dict[str, str | list[str] | None] = {}
-        table_cache: dict[str, list[str]] = {}
-
-        def uniq_urls(urls: list[str]) -> list[str]:
-            seen = set()
-            out = []
-            for u in urls:
-                if not u:
-                    continue
-                if u.startswith("//"):
-                    u = "https:" + u
-                if u in seen:
-                    continue
-                seen.add(u)
-                out.append(u)
-            return out
-
-        def get_table_val(label: str) -> list[str]:
-            if label in table_cache:
-                return table_cache[label]
-            val = tree.xpath(f"//table[@id='work_outline']//tr[th[contains(text(),'{label}')]]/td/a/text()")
-            if not val:
-                val = tree.xpath(f"//table[@id='work_outline']//tr[th[contains(text(),'{label}')]]/td/text()")
-            cleaned = [v.strip() for v in val if v and v.strip()]
-            table_cache[label] = cleaned
-            return cleaned
-
-        title = tree.xpath("//h1[@id='work_name']/text()")
-        data["title"] = title[0] if title else None
-
-        circle = tree.xpath("//span[@class='maker_name']//a/text()")
-        data["circle"] = circle[0] if circle else None
-
-        desc_section = tree.xpath("/html/body/div[3]/div[4]/div[1]/div/div[3]")
-        if not desc_section:
-            desc_section = tree.xpath("//div[contains(@class, 'work_parts_container')]")
-        desc_root = desc_section[0] if desc_section else None
-
-        data["description"] = "\n".join(desc_root.itertext()).strip() if desc_root is not None else None
-        desc_images: list[str] = []
-        if desc_root is not None:
-            for img in desc_root.xpath(".//img"):
-                src = img.get("src") or img.get("data-src")
-                if src:
-                    desc_images.append(src)
-        content_tokens: list[dict] = []
-        if desc_root is not None:
-            def add_text(txt: str):
-                if txt and txt.strip():
-                    content_tokens.append({"type": "text", "content": txt})
-
-            for elem in desc_root.iter():
-                if elem.text:
-                    add_text(elem.text)
-                if elem.tag == "img":
-                    img_src = elem.get("src") or elem.get("data-src")
-                    if img_src:
-                        norm_img = img_src if not img_src.startswith("//") else "https:" + img_src
-                        content_tokens.append({"type": "image", "url": norm_img})
-                if elem.tail:
-                    add_text(elem.tail)
-        data["content_tokens"] = content_tokens
-
-        release_date = get_table_val("販売日")
-        data["release_date"] = release_date[0] if release_date else None
-        data["cv"] = get_table_val("声優")
-        data["age_limit"] = get_table_val("年齢指定")
-        data["work_type"] = get_table_val("作品形式")
-        data["file_format"] = get_table_val("ファイル形式")
-        data["genres"] = tree.xpath("//div[@class='main_genre']//a/text()")
-
-        file_size = tree.xpath("//table[@id='work_outline']//tr[th[contains(text(),'ファイル容量')]]/td/div/text()")
-        data["file_size"] = file_size[0].strip() if file_size else None
-
-        # Chobit Integration (main page iframe -> fallback to any chobit URL)
-        data["chobit_url"] = None
-        chobit_iframe = tree.xpath("//iframe[contains(@src, 'chobit.cc')]/@src")
-        if chobit_iframe:
-            data["chobit_url"] = _with_affiliate_id(chobit_iframe[0])
-        if not data["chobit_url"]:
-            raw_from_body = _find_chobit_url(res.text)
-            if raw_from_body:
-                data["chobit_url"] = _with_affiliate_id(raw_from_body)
-        # As a last resort, try the affiliate tool page (opt-in via env to avoid extra requests)
-        if not data["chobit_url"] and settings.enable_chobit_affiliate_fallback:
-            aff_url = f"https://www.dlsite.com/maniax/dlaf/tool/=/work_id/{rj_code}"
-            try:
-                aff_res = requests.get(aff_url, headers=headers, timeout=10)
-                if aff_res.ok:
-                    raw_from_aff = _find_chobit_url(aff_res.text)
-                    if raw_from_aff:
-                        data["chobit_url"] = _with_affiliate_id(raw_from_aff)
-            except Exception as exc:
-                print(f"[{rj_code}] Chobit fallback fetch error: {exc}")
-        # Chobit search page as another fallback
-        if not data["chobit_url"] and settings.enable_chobit_search:
-            data["chobit_url"] = fetch_chobit_via_search(rj_code)
-
-        # Media (sample images) from slider (preferred) or fallback path
-        sample_urls: list[str] = []
-        slider_data = tree.xpath("//div[@id='product_slider_data'] | //div[contains(@class, 'product-slider-data')]")
-        if slider_data:
-            for div in slider_data[0].xpath(".//div[@data-src]"):
-                src = div.get("data-src")
-                if src:
-                    sample_urls.append(src)
-        # Explicit fallback path provided by user
-        sample_fallback = tree.xpath("/html/body/div[3]/div[4]/div[1]/div/div[1]/div[1]//img")
-        for img in sample_fallback:
-            src = img.get("data-src") or img.get("src")
-            if src:
-                sample_urls.append(src)
-
-        sample_urls = uniq_urls(sample_urls)
-        desc_images = uniq_urls(desc_images)
-        # Avoid downloading the same file twice across sample/desc
-        sample_set = set(sample_urls)
-        desc_images = [u for u in desc_images if u not in sample_set]
+        data = page_cache.load_parsed(res, STATIC_PARSER_VERSION)
+        if data is None:
+            data = parse_static_page(res.content, res.text)
+            page_cache.store_parsed(res, STATIC_PARSER_VERSION, data)
 
-        data["media"] = sample_urls
-        data["desc_images"] = desc_images
+        # Affiliate tool page / chobit search, remembered per work in chobit_cache
+        if not data["chobit_url"]:
+            data["chobit_url"] = resolve_chobit_fallback(rj_code)
 
         return data
 
@@ -350,14 +479,16 @@ def save_work_to_json(
     download_media: bool = False,
     image_root: Path | None = None,
     chobit_only: bool = False,
+    sink=None,
 ) -> bool:
-    """Fetch data for a single RJ code and persist to JSON.
+    """Fetch data for a single RJ code and hand it to the output sink.
 
+    - The record goes to ``sink`` (see services.sinks); by default the one configured by
+      SCRAPE_SINK, writing JSON files under ``output_dir``.
     - If chobit_only=True, only static page fetch is performed (for chobit embed and metadata).
     - If download_media=True, main and sample images are downloaded to image_root/rj_code/.
     """
-    output_dir = Path(output_dir or settings.data_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    sink = sink or make_sink(output_dir=output_dir)
 
     print(f"Processing: {rj_code}")
     static_data = fetch_static_data(rj_code)
@@ -367,17 +498,17 @@ def save_work_to_json(
         print(f"Failed to fetch any data for {rj_code}")
         return False
 
+    scraped_at = time.time()
     full_data = {
         "rj_code": rj_code,
-        "scraped_at_ts": time.time(),
+        "scraped_at_ts": scraped_at,
+        # Stats-only refreshes rewrite scraped_at_ts but keep this one
+        "static_scraped_at_ts": scraped_at if static_data else None,
         "static_info": static_data,
         "dynamic_info": dynamic_data if dynamic_data else {},
     }
 
-    filename = output_dir / f"{rj_code}.json"
-    with filename.open("w", encoding="utf-8") as f:
-        json.dump(full_data, f, ensure_ascii=False, indent=4)
-
+    # Images first: the sink builds the work's document, whose thumbs come from disk
     if download_media:
         main_img = dynamic_data.get("work_image") if dynamic_data else None
         desc_imgs = static_data.get("desc_images", [])
@@ -393,10 +524,30 @@ def save_work_to_json(
             desc_urls=desc_imgs,
         )
 
-    print(f"Saved successfully: {filename}")
+    saved_to = sink.write(full_data)
+    print(f"Saved successfully: {saved_to}")
     return True
 
 
+def refresh_dynamic_data(
+    rj_codes: list[str],
+    output_dir: Path | None = None,
+    chunk_size: int | None = None,
+    sink=None,
+) -> list[str]:
+    """Stats-only refresh: update ``dynamic_info`` of already scraped works via batch calls.
+
+    Static info is left untouched. Returns the codes that were updated.
+    """
+    sink = sink or make_sink(output_dir=output_dir)
+    targets = sink.known_codes(rj_codes)
+    fresh = fetch_dynamic_data_batch(targets, chunk_size=chunk_size)
+
+    updated = sink.update_dynamic({code: fresh[code] for code in targets if fresh.get(code)}, time.time())
+    print(f"Refreshed dynamic data for {len(updated)}/{len(targets)} work(s).")
+    return updated
+
+
 def load_works(filepath: str | Path = "works.txt") -> list[str]:
     """Load RJ codes from a text file, deduplicate, and write back normalized order."""
     path = Path(filepath)
@@ -409,12 +560,96 @@ def load_works(filepath: str | Path = "works.txt") -> list[str]:
     return unique_codes
 
 
-def scrape_from_file(works_file: str | Path = "works.txt", output_dir: Path | None = None):
-    """Scrape all RJ codes listed in works_file."""
+def default_progress_path(name: str) -> Path:
+    return settings.cache_dir / "scrape_progress" / f"{name}.jsonl"
+
+
+def _load_progress(path: Path) -> set[str]:
+    done: set[str] = set()
+    if not path.exists():
+        return done
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # torn last line from a crash
+        if entry.get("ok"):
+            done.add(entry["rj_code"])
+    return done
+
+
+def scrape_many(
+    codes: list[str],
+    workers: int | None = None,
+    progress_path: Path | None = None,
+    **save_kwargs,
+) -> dict[str, bool]:
+    """Scrape many RJ codes concurrently; returns ``{rj_code: success}`` in input order.
+
+    Politeness comes from the per-host token buckets in services.ratelimit, so
+    ``workers`` only bounds how many works are in flight. When ``progress_path`` is
+    given, finished codes are appended to it and skipped on the next call, so an
+    interrupted run resumes where it stopped; the file is removed once the run has
+    attempted every code. Extra keyword arguments are passed to :func:`save_work_to_json`.
+    """
+    workers = max(1, workers or settings.scrape_concurrency)
+    # One sink shared by all workers
+    if save_kwargs.get("sink") is None:
+        save_kwargs["sink"] = make_sink(output_dir=save_kwargs.pop("output_dir", None))
+    done = _load_progress(progress_path) if progress_path else set()
+    pending = [code for code in dict.fromkeys(codes) if code not in done]
+    if done:
+        print(f"Resuming: {len(done)} already done, {len(pending)} remaining.")
+
+    results: dict[str, bool] = {code: True for code in codes if code in done}
+    lock = threading.Lock()
+    log = None
+    if progress_path:
+        progress_path.parent.mkdir(parents=True, exist_ok=True)
+        log = progress_path.open("a", encoding="utf-8")
+
+    def run(code: str) -> bool:
+        try:
+            ok = save_work_to_json(code, **save_kwargs)
+        except Exception as exc:
+            print(f"[{code}] Unexpected error: {exc}")
+            ok = False
+        if log:
+            with lock:
+                log.write(json.dumps({"rj_code": code, "ok": ok, "ts": time.time()}) + "\n")
+                log.flush()
+        return ok
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() yields in input order, so progress output stays ordered
+            for index, (code, ok) in enumerate(zip(pending, pool.map(run, pending)), start=1):
+                results[code] = ok
+                print(f"[{index}/{len(pending)}] {code}: {'ok' if ok else 'failed'}")
+    finally:
+        if log:
+            log.close()
+
+    # Every code was attempted: the next call is a fresh run, not a resume
+    if progress_path:
+        progress_path.unlink(missing_ok=True)
+    return {code: results.get(code, False) for code in dict.fromkeys(codes)}
+
+
+def scrape_from_file(
+    works_file: str | Path = "works.txt",
+    output_dir: Path | None = None,
+    workers: int | None = None,
+):
+    """Scrape all RJ codes listed in works_file (resumable, see :func:`scrape_many`)."""
+    sink = make_sink(output_dir=output_dir)
     print(f"Loading targets from {works_file}...")
     targets = load_works(works_file)
     print(f"Found {len(targets)} unique works.")
 
-    for code in targets:
-        save_work_to_json(code, output_dir=output_dir)
-        time.sleep(random.uniform(2, 5))
+    scrape_many(
+        targets,
+        workers=workers,
+        progress_path=default_progress_path(Path(works_file).stem),
+        sink=sink,
+    )
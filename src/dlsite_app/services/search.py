@@ -0,0 +1,297 @@
+import ast
+import heapq
+import html
+import math
+import sqlite3
+import re
+from functools import lru_cache
+from typing import Callable
+
+
+# Formula variable -> (work field, default used when the field is empty). Mirrors the
+# scope built by applySort() in templates/index.html.
+FORMULA_VARIABLES = {
+    "dl": ("dl_count", 0.0),
+    "price": ("price", 1.0),
+    "rate": ("rate_average", 0.0),
+    "fav": ("wishlist_count", 0.0),
+}
+MAX_FORMULA_LENGTH = 200
+SEARCH_PREFIXES = ("cv", "circle", "tag")
+FTS_MIN_TERM_LENGTH = 3  # trigram tokens: shorter terms cannot hit the index
+# bm25 column weights: rj_code, title, circle, cv, genres, description
+FTS_WEIGHTS = (2.0, 10.0, 5.0, 5.0, 3.0, 1.0)
+CV_COUNT_GENRE = re.compile(r"^\d+cv$")  # "2cv" is derived from the CV list, not stored
+
+
+class FormulaError(ValueError):
+    """Raised when a sort formula is not in the allowed arithmetic subset."""
+
+
+def _safe(fn: Callable[..., float]) -> Callable[..., float]:
+    def wrapper(*args):
+        try:
+            return float(fn(*args))
+        except (ValueError, OverflowError, ZeroDivisionError, TypeError):
+            return math.nan
+
+    return wrapper
+
+
+def _div(a: float, b: float) -> float:
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+FORMULA_FUNCTIONS = {
+    "abs": abs,
+    "sqrt": math.sqrt,
+    "log": math.log,
+    "log10": math.log10,
+    "exp": math.exp,
+    "min": min,
+    "max": max,
+    "pow": math.pow,
+    "round": round,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+_RUNTIME = {f"_fn_{name}": _safe(fn) for name, fn in FORMULA_FUNCTIONS.items()}
+_RUNTIME.update({"_div": _div, "_mod": _safe(math.fmod), "_pow": _safe(math.pow), "zip": zip})
+_BIN_OPS = {
+    ast.Add: None,
+    ast.Sub: None,
+    ast.Mult: None,
+    ast.Div: "_div",
+    ast.Mod: "_mod",
+    ast.Pow: "_pow",
+    ast.BitXor: "_pow",  # math.js writes powers as a ^ b
+}
+
+
+class _FormulaRewriter(ast.NodeTransformer):
+    """Validate the formula AST and route risky operators through safe helpers."""
+
+    def generic_visit(self, node):
+        allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.UAdd, ast.USub, ast.Load, ast.operator)
+        if not isinstance(node, allowed):
+            raise FormulaError(f"Unsupported syntax: {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp):
+        if type(node.op) not in _BIN_OPS:
+            raise FormulaError(f"Unsupported operator: {type(node.op).__name__}")
+        node = self.generic_visit(node)
+        helper = _BIN_OPS[type(node.op)]
+        if helper is None:
+            return node
+        return ast.Call(func=ast.Name(id=helper, ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+
+    def visit_Constant(self, node: ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FormulaError(f"Unsupported constant: {node.value!r}")
+        return ast.Constant(value=float(node.value))
+
+    def visit_Name(self, node: ast.Name):
+        if node.id not in FORMULA_VARIABLES:
+            raise FormulaError(f"Unknown variable: {node.id}")
+        return node
+
+    def visit_Call(self, node: ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FORMULA_FUNCTIONS or node.keywords:
+            raise FormulaError(f"Unsupported function call: {ast.unparse(node.func)}")
+        args = [self.visit(arg) for arg in node.args]
+        return ast.Call(func=ast.Name(id=f"_fn_{node.func.id}", ctx=ast.Load()), args=args, keywords=[])
+
+
+@lru_cache(maxsize=128)
+def compile_formula(formula: str) -> Callable[[dict[str, list[float]]], list[float]]:
+    """Compile a math.js-style formula once into a function over whole numeric columns.
+
+    The returned callable takes ``{"dl": [...], "price": [...], ...}`` and evaluates the
+    expression in a single list comprehension instead of re-interpreting it per work.
+    """
+    formula = (formula or "").strip()
+    if not formula:
+        raise FormulaError("Empty formula")
+    if len(formula) > MAX_FORMULA_LENGTH:
+        raise FormulaError("Formula is too long")
+    try:
+        tree = ast.parse(formula, mode="eval")
+    except SyntaxError as exc:
+        raise FormulaError(f"Invalid formula: {exc.msg}") from exc
+
+    expr = ast.unparse(_FormulaRewriter().visit(tree).body)
+    names = ", ".join(FORMULA_VARIABLES)
+    source = f"lambda {names}: [{expr} for {names} in zip({names})]"
+    evaluate = eval(compile(source, "<formula>", "eval"), {"__builtins__": {}, **_RUNTIME})
+
+    def score(columns: dict[str, list[float]]) -> list[float]:
+        return evaluate(*(columns[name] for name in FORMULA_VARIABLES))
+
+    return score
+
+
+def _to_float(value, default: float) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return number or default
+
+
+def numeric_columns(works: list[dict]) -> dict[str, list[float]]:
+    """Extract the formula variables from works as parallel float columns."""
+    return {
+        name: [_to_float(work.get(field), default) for work in works]
+        for name, (field, default) in FORMULA_VARIABLES.items()
+    }
+
+
+def split_prefix(term: str) -> tuple[str | None, str]:
+    """Split ``cv:``/``circle:``/``tag:`` off a lowercased search term."""
+    lowered = term.strip().lower()
+    for prefix in SEARCH_PREFIXES:
+        if lowered.startswith(f"{prefix}:"):
+            return prefix, lowered[len(prefix) + 1 :].strip()
+    return None, lowered
+
+
+def _lower_all(values) -> list[str]:
+    return [v.lower() for v in values or [] if isinstance(v, str)]
+
+
+def matches_query(work: dict, query: str) -> bool:
+    """Substring match used by the search box (same rules as applySort)."""
+    prefix, value = split_prefix(query)
+    if not value and prefix is None:
+        return True
+    circle = (work.get("circle") or "").lower()
+    if prefix == "cv":
+        return any(value in c for c in _lower_all(work.get("cv")))
+    if prefix == "circle":
+        return value in circle
+    if prefix == "tag":
+        return any(value in g for g in _lower_all(work.get("genres")))
+    return (
+        value in (work.get("title") or "").lower()
+        or value in circle
+        or value in (work.get("rj_code") or "").lower()
+        or any(value in c for c in _lower_all(work.get("cv")))
+        or any(value in g for g in _lower_all(work.get("genres")))
+    )
+
+
+def matches_tag(work: dict, tag: str) -> bool:
+    """Exact tag filter used for include/exclude chips (same rules as checkTagMatch)."""
+    prefix, value = split_prefix(tag)
+    if prefix == "cv":
+        return value in _lower_all(work.get("cv"))
+    if prefix == "circle":
+        return (work.get("circle") or "").lower() == value
+    if prefix == "tag":
+        return value in _lower_all(work.get("genres"))
+    return tag in (work.get("genres") or [])
+
+
+def tag_filter_sql(tag: str) -> tuple[str, list] | None:
+    """SQL condition on ``w`` equivalent to :func:`matches_tag`, via the indexed lookup tables.
+
+    Compares the ``*_key`` columns (Python-lowercased at ingest, like ``value``).
+    Returns None for tags only Python can decide (e.g. the derived "2cv" genre).
+    """
+    prefix, value = split_prefix(tag)
+    if not value:
+        return None
+    if prefix == "cv":
+        return "w.rj_code IN (SELECT rj_code FROM work_cv WHERE cv_key = ?)", [value]
+    if prefix == "tag" and not CV_COUNT_GENRE.match(value):
+        return "w.rj_code IN (SELECT rj_code FROM work_genres WHERE genre_key = ?)", [value]
+    if prefix == "circle":
+        return "w.circle_key = ?", [value]
+    return None
+
+
+def fts_match_expression(query: str) -> str | None:
+    """Build an FTS5 MATCH string (AND of quoted terms) for a free-text query.
+
+    Returns None when the query has a prefix or a term too short for the trigram index;
+    callers then fall back to :func:`matches_query`.
+    """
+    prefix, _ = split_prefix(query)
+    terms = query.split()
+    if prefix is not None or not terms or any(len(t) < FTS_MIN_TERM_LENGTH for t in terms):
+        return None
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def fts_ranked_codes(conn, match: str) -> list[str] | None:
+    """rj_codes matching ``match`` ordered by bm25 relevance (None if FTS is unavailable)."""
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    try:
+        rows = conn.execute(
+            f"SELECT rj_code FROM works_fts WHERE works_fts MATCH ? ORDER BY bm25(works_fts, {weights})",
+            (match,),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    return [row[0] for row in rows]
+
+
+def fts_snippets(conn, match: str, rj_codes: list[str], tokens: int = 16) -> dict[str, str]:
+    """HTML-escaped snippets with matches wrapped in <mark>, for the given works only."""
+    if not rj_codes:
+        return {}
+    placeholders = ", ".join("?" for _ in rj_codes)
+    rows = conn.execute(
+        f"""
+        SELECT rj_code, snippet(works_fts, -1, char(2), char(3), '…', ?)
+        FROM works_fts WHERE works_fts MATCH ? AND rj_code IN ({placeholders})
+        """,
+        (tokens, match, *rj_codes),
+    ).fetchall()
+    return {
+        rj_code: html.escape(text or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+        for rj_code, text in rows
+    }
+
+
+def search_works(
+    works: list[dict],
+    query: str = "",
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    formula: str | None = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> tuple[int, list[dict]]:
+    """Filter works and return ``(total_matches, page)`` ranked by ``formula``.
+
+    Only the requested page is materialized: scores are computed column-wise and the
+    top ``offset + limit`` are selected with a heap rather than sorting every match.
+    Each returned work carries its ``score`` (None when no formula or not finite).
+    """
+    include = include or []
+    exclude = exclude or []
+    matched = [
+        work
+        for work in works
+        if matches_query(work, query)
+        and all(matches_tag(work, tag) for tag in include)
+        and not any(matches_tag(work, tag) for tag in exclude)
+    ]
+
+    if formula:
+        scores = compile_formula(formula)(numeric_columns(matched))
+        ranked = [-math.inf if math.isnan(s) else s for s in scores]
+        top = heapq.nlargest(offset + limit, range(len(matched)), key=ranked.__getitem__)
+        page = [
+            {**matched[i], "score": scores[i] if math.isfinite(scores[i]) else None}
+            for i in top[offset:]
+        ]
+    else:
+        page = [{**work, "score": None} for work in matched[offset : offset + limit]]
+    return len(matched), page
@@ -0,0 +1,149 @@
+"""Where scraped records go: RJxxx.json files, the SQLite DB, or both.
+
+``SCRAPE_SINK=db`` upserts each work as soon as it is scraped, so it shows up in
+/api/works without a JSON write + ingest round trip. ``json`` keeps the raw files for
+a later ``ingest_json_files()`` run; ``both`` does both.
+"""
+
+import json
+import threading
+from pathlib import Path
+
+from dlsite_app.config import settings
+from dlsite_app.db import bump_catalog_version, get_db_connection
+from dlsite_app.services.ingest import refresh_affiliate_links, update_dynamic_records, upsert_records
+from dlsite_app.services.migrations import migrate
+
+
+SINK_MODES = ("json", "db", "both")
+
+
+class JsonSink:
+    """One ``RJxxx.json`` file per work under ``output_dir``."""
+
+    writes_db = False
+
+    def __init__(self, output_dir: Path | None = None):
+        self.output_dir = Path(output_dir or settings.data_dir)
+
+    def _path(self, rj_code: str) -> Path:
+        return self.output_dir / f"{rj_code}.json"
+
+    def write(self, record: dict) -> str:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        filename = self._path(record["rj_code"])
+        with filename.open("w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=4)
+        return str(filename)
+
+    def known_codes(self, rj_codes: list[str]) -> list[str]:
+        return [code for code in rj_codes if self._path(code).exists()]
+
+    def update_dynamic(self, fresh: dict[str, dict], scraped_at: float) -> list[str]:
+        updated = []
+        for code, dynamic in fresh.items():
+            filename = self._path(code)
+            try:
+                with filename.open("r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except Exception as exc:
+                print(f"[{code}] Cannot read {filename}: {exc}")
+                continue
+            # Records from before static_scraped_at_ts: the last full scrape was scraped_at_ts
+            record.setdefault("static_scraped_at_ts", record.get("scraped_at_ts"))
+            record["dynamic_info"] = dynamic
+            record["scraped_at_ts"] = scraped_at
+            self.write(record)
+            updated.append(code)
+        return updated
+
+
+class DbSink:
+    """Upserts each record straight into SQLite (one short transaction per write).
+
+    Scrape workers share one sink; writes are serialized by a lock and each opens its
+    own connection, so no connection crosses threads.
+    """
+
+    writes_db = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def _connect(self):
+        conn = get_db_connection()
+        if not self._migrated:
+            migrate(conn)
+            with conn:
+                if refresh_affiliate_links(conn):
+                    bump_catalog_version(conn)
+            self._migrated = True
+        return conn
+
+    def _transaction(self, apply) -> list[str]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                written = apply(conn)
+                if written:
+                    bump_catalog_version(conn)
+                conn.commit()
+                return written
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def write(self, record: dict) -> str:
+        self._transaction(lambda conn: upsert_records(conn, [record]))
+        return f"db:{record['rj_code']}"
+
+    def known_codes(self, rj_codes: list[str]) -> list[str]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                known = {row[0] for row in conn.execute("SELECT rj_code FROM works")}
+            finally:
+                conn.close()
+        return [code for code in rj_codes if code in known]
+
+    def update_dynamic(self, fresh: dict[str, dict], scraped_at: float) -> list[str]:
+        return self._transaction(lambda conn: update_dynamic_records(conn, fresh))
+
+
+class MultiSink:
+    """Fan out to several sinks (``both``): files first, then the DB."""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+        self.writes_db = any(sink.writes_db for sink in sinks)
+
+    def write(self, record: dict) -> str:
+        return ", ".join(sink.write(record) for sink in self.sinks)
+
+    def known_codes(self, rj_codes: list[str]) -> list[str]:
+        known = set()
+        for sink in self.sinks:
+            known.update(sink.known_codes(rj_codes))
+        return [code for code in rj_codes if code in known]
+
+    def update_dynamic(self, fresh: dict[str, dict], scraped_at: float) -> list[str]:
+        updated: dict[str, None] = {}
+        for sink in self.sinks:
+            updated.update(dict.fromkeys(sink.update_dynamic(fresh, scraped_at)))
+        return list(updated)
+
+
+def make_sink(mode: str | None = None, output_dir: Path | None = None):
+    """Build the sink for ``mode`` (defaults to ``settings.scrape_sink``)."""
+    mode = (mode or settings.scrape_sink).lower()
+    if mode == "json":
+        return JsonSink(output_dir)
+    if mode == "db":
+        return DbSink()
+    if mode == "both":
+        return MultiSink(JsonSink(output_dir), DbSink())
+    raise ValueError(f"Unknown scrape sink {mode!r}; expected one of {', '.join(SINK_MODES)}")
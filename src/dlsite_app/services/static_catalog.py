@@ -0,0 +1,221 @@
+"""Sharded, precompressed catalog export for DB-less deployments.
+
+``export_catalog()`` writes into ``static/catalog/``:
+
+- ``index.<hash>.json``: every work's card fields (what the grid needs)
+- ``works-<shard>.<hash>.json``: full documents, grouped by RJ code prefix
+- ``.gz`` (and ``.br`` when the brotli package is installed) next to each of them
+- ``manifest.json``: the only unhashed file, naming the current index and shards
+
+Hashed files never change, so they can be cached forever; a new export only swaps the
+manifest (the previous export's files stay until the one after). The frontend and the
+API's static fallback both start from the manifest; the fallback keeps file bytes in
+memory (:class:`SnapshotCache`) until their mtime changes.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from dlsite_app.config import settings
+from dlsite_app.services.documents import CARD_FIELDS, encode, project
+from dlsite_app.services.page_cache import atomic_write
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+CATALOG_DIR = settings.base_dir / "static" / "catalog"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# Works per shard: RJ01013222 lives in shard "RJ01013" (codes sharing all but 3 digits)
+SHARD_SUFFIX_DIGITS = 3
+# What _write_hashed produces (with its compressed siblings); nothing else is cleaned up
+_HASHED_RE = re.compile(r"(?:index|works-[^.]+)\.[0-9a-f]{12}\.json(?:\.gz|\.br)?")
+
+
+def shard_key(rj_code: str, digits: int = SHARD_SUFFIX_DIGITS) -> str:
+    return rj_code[:-digits] if len(rj_code) > digits else rj_code
+
+
+def _write_hashed(out_dir: Path, stem: str, body: bytes) -> str:
+    """Write ``<stem>.<hash>.json`` plus compressed siblings; returns the file name."""
+    name = f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}.json"
+    encoders = {"": lambda data: data, ".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders[".br"] = lambda data: brotli.compress(data, quality=11)
+    for suffix, compress in encoders.items():
+        path = out_dir / (name + suffix)
+        if not path.exists():  # same hash, same bytes: unchanged shards are not rewritten
+            atomic_write(path, compress(body))
+    return name
+
+
+def export_catalog(conn, out_dir: Path | None = None, digits: int = SHARD_SUFFIX_DIGITS) -> dict:
+    """Export the stored work documents as a sharded static catalog; returns the manifest."""
+    out_dir = Path(out_dir or CATALOG_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    cards: list[str] = []
+    shards: dict[str, list[str]] = {}
+    for rj_code, card, doc in conn.execute("SELECT rj_code, card, doc FROM work_docs ORDER BY rj_code"):
+        cards.append(card)
+        shards.setdefault(shard_key(rj_code, digits), []).append(doc)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generated_at": int(time.time()),
+        "count": len(cards),
+        "fields": list(CARD_FIELDS),
+        "index": _write_hashed(out_dir, "index", ("[" + ",".join(cards) + "]").encode("utf-8")),
+        "shard_suffix_digits": digits,
+        "shards": {
+            key: _write_hashed(out_dir, f"works-{key}", ("[" + ",".join(docs) + "]").encode("utf-8"))
+            for key, docs in shards.items()
+        },
+        "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+    }
+    previous = _read_manifest(out_dir / MANIFEST_NAME)
+    atomic_write(out_dir / MANIFEST_NAME, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+
+    # Drop files of older exports, but keep the previous generation: pages that loaded
+    # the old manifest still fetch its shards
+    keep = _manifest_files(manifest) | _manifest_files(previous)
+    for path in out_dir.iterdir():
+        if _HASHED_RE.fullmatch(path.name) and path.name.split(".json")[0] + ".json" not in keep:
+            path.unlink()
+    return manifest
+
+
+def _read_manifest(path: Path) -> dict | None:
+    try:
+        manifest = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
+
+def _manifest_files(manifest: dict | None) -> set[str]:
+    if not manifest:
+        return set()
+    shards = manifest.get("shards")
+    return {manifest.get("index"), *(shards.values() if isinstance(shards, dict) else ())} - {None}
+
+
+def load_manifest(out_dir: Path | None = None) -> dict | None:
+    snapshot = snapshots.get(Path(out_dir or CATALOG_DIR) / MANIFEST_NAME)
+    manifest = snapshot.parsed if snapshot else None
+    return manifest if isinstance(manifest, dict) and manifest.get("version") == MANIFEST_VERSION else None
+
+
+class Snapshot:
+    """Bytes of a static JSON file as of one (mtime, size), parsed at most once."""
+
+    def __init__(self, path: Path, stat: os.stat_result, body: bytes):
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.body = body
+        self.etag = f"static-{self.mtime_ns:x}-{self.size:x}"
+        self._parsed = None
+        self._by_code: dict[str, dict] | None = None
+        self._encoded: dict[tuple[str, ...], tuple[list[str], list[str]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def parsed(self):
+        """The decoded JSON (None if the file is not valid JSON)."""
+        if self._parsed is None:
+            with self._lock:
+                if self._parsed is None:
+                    try:
+                        self._parsed = (json.loads(self.body),)
+                    except ValueError:
+                        self._parsed = (None,)
+        return self._parsed[0]
+
+    @property
+    def data(self) -> list[dict]:
+        return self.parsed if isinstance(self.parsed, list) else []
+
+    def get(self, rj_code: str) -> dict | None:
+        if self._by_code is None:
+            self._by_code = {w.get("rj_code"): w for w in self.data if isinstance(w, dict)}
+        return self._by_code.get(rj_code)
+
+    def encoded(self, fields: tuple[str, ...]) -> tuple[list[str], list[str]]:
+        """``(rj_codes, encoded documents)`` in rj_code order, projected onto ``fields``.
+
+        Built once per snapshot and field set, so pages are spliced from stored strings.
+        """
+        rows = self._encoded.get(fields)
+        if rows is None:
+            works = sorted((w for w in self.data if isinstance(w, dict)), key=lambda w: w.get("rj_code") or "")
+            rows = ([w.get("rj_code") or "" for w in works], [encode(project(w, fields)) for w in works])
+            with self._lock:
+                self._encoded[fields] = rows
+        return rows
+
+
+class SnapshotCache:
+    """LRU of static file snapshots; a changed mtime or size reloads the file."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Path, Snapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> Snapshot | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(path)
+                return entry
+        try:
+            entry = Snapshot(path, stat, path.read_bytes())
+        except OSError:
+            return None
+        with self._lock:
+            self._entries[path] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+snapshots = SnapshotCache()
+
+
+def index_snapshot(manifest: dict, out_dir: Path | None = None) -> Snapshot | None:
+    """Snapshot of the card index (a JSON array of every exported work's card fields)."""
+    return snapshots.get(Path(out_dir or CATALOG_DIR) / manifest["index"])
+
+
+def load_index(manifest: dict, out_dir: Path | None = None) -> list[dict]:
+    """Card documents of every exported work."""
+    snapshot = index_snapshot(manifest, out_dir)
+    return snapshot.data if snapshot else []
+
+
+def load_detail(manifest: dict, rj_code: str, out_dir: Path | None = None) -> dict | None:
+    """Full document of one work, reading only its shard."""
+    name = manifest["shards"].get(shard_key(rj_code, manifest.get("shard_suffix_digits", SHARD_SUFFIX_DIGITS)))
+    if not name:
+        return None
+    snapshot = snapshots.get(Path(out_dir or CATALOG_DIR) / name)
+    return snapshot.get(rj_code) if snapshot else None
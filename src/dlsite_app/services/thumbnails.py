@@ -0,0 +1,129 @@
+"""Resized card thumbnails (WebP + JPEG in a few fixed widths).
+
+Generated from a work's main image right after it is downloaded. Variants are stored
+once per source blob under ``image_root/.blobs/thumbs/`` and linked as
+``image_root/<rj_code>/thumbs/<width>w.<ext>``; ``thumbs.json`` next to them lists what
+exists so the API documents can offer a ``srcset``. Pillow is optional: without it no
+thumbnails are made and cards keep using the original image.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from dlsite_app.config import settings
+from dlsite_app.services import images
+from dlsite_app.services.page_cache import atomic_write
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+
+THUMB_WIDTHS = (240, 480, 720)
+# Pillow format name, file extension, save options
+THUMB_FORMATS = (
+    ("WEBP", "webp", {"quality": 80, "method": 4}),
+    ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+THUMBS_MANIFEST = "thumbs.json"
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def variant_names() -> set[str]:
+    return {f"{width}w.{ext}" for width in THUMB_WIDTHS for _, ext, _ in THUMB_FORMATS}
+
+
+def _save_variant(img, width: int, fmt: str, options: dict, dest: Path) -> tuple[int, int]:
+    resized = img.copy()
+    resized.thumbnail((width, width * 4), Image.LANCZOS)
+    if fmt == "JPEG" and resized.mode not in ("RGB", "L"):
+        resized = resized.convert("RGB")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=dest.name, suffix=".tmp")
+    os.close(fd)
+    try:
+        resized.save(tmp, fmt, **options)
+        os.replace(tmp, dest)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return resized.size
+
+
+def make_thumbnails(rj_code: str, image_root: Path | None = None) -> dict | None:
+    """Build the thumbnail variants of ``rj_code``'s main image; returns the thumbs manifest."""
+    if Image is None:
+        return None
+    image_root = Path(image_root or settings.image_root)
+    work_dir = image_root / rj_code
+    entry = next(
+        (e for name, e in images.load_manifest(work_dir).items() if name.startswith("main.")),
+        None,
+    )
+    if entry is None:
+        return None
+
+    current = load_thumbs(rj_code, image_root)
+    if current and current.get("source") == entry["sha256"]:
+        return current
+
+    source = images.blob_path(image_root, entry["sha256"], entry["ext"])
+    blob_dir = image_root / images.BLOB_DIR / "thumbs" / entry["sha256"][:2] / entry["sha256"]
+    variants = {}
+    try:
+        with Image.open(source) as img:
+            img.load()
+            for width in THUMB_WIDTHS:
+                # Never upscale; keep the smallest width so there is always one variant
+                if width > img.width and variants:
+                    break
+                for fmt, ext, options in THUMB_FORMATS:
+                    name = f"{width}w.{ext}"
+                    blob = blob_dir / name
+                    if blob.exists():  # same source already thumbnailed for another work
+                        with Image.open(blob) as done:
+                            size = done.size
+                    else:
+                        size = _save_variant(img, width, fmt, options, blob)
+                    images.link_blob(blob, work_dir / "thumbs" / name)
+                    variants[name] = {"width": size[0], "height": size[1], "format": ext}
+    except Exception as exc:
+        print(f"[{rj_code}] Thumbnail generation failed: {exc}")
+        return None
+
+    manifest = {"source": entry["sha256"], "variants": variants}
+    atomic_write(work_dir / THUMBS_MANIFEST, json.dumps(manifest, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def load_thumbs(rj_code: str, image_root: Path | None = None) -> dict | None:
+    path = Path(image_root or settings.image_root) / rj_code / THUMBS_MANIFEST
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def srcsets(rj_code: str, image_root: Path | None = None) -> dict | None:
+    """``{"webp": srcset, "jpg": srcset, "src": fallback url}`` for cards, or None.
+
+    URLs carry the source hash so the long-lived cache headers of the thumbnail route
+    never serve an outdated image.
+    """
+    manifest = load_thumbs(rj_code, image_root)
+    if not manifest or not manifest.get("variants"):
+        return None
+    version = manifest["source"][:12]
+    out: dict[str, str] = {}
+    for name, meta in sorted(manifest["variants"].items(), key=lambda item: item[1]["width"]):
+        url = f"/images/{rj_code}/thumbs/{name}?v={version}"
+        out[meta["format"]] = ", ".join(filter(None, [out.get(meta["format"]), f"{url} {meta['width']}w"]))
+        if meta["format"] == "jpg" and meta["width"] <= 480:
+            out["src"] = url
+    return out
@@ -0,0 +1,103 @@
+// Normalized search index over the catalog's card fields, shared by the page and the
+// search worker (static/js/search_worker.js). Everything is lowercased once in add();
+// a query is then a few substring/set lookups per work and one compiled formula call.
+(function (root) {
+    const SEP = '\u0000';  // never typed in a query, so matches cannot span two values
+
+    function lowerAll(values) {
+        return (values || []).map(v => String(v).toLowerCase());
+    }
+
+    function makeEntry(work) {
+        const cv = lowerAll(work.cv);
+        const genres = lowerAll(work.genres);
+        const title = (work.title || '').toLowerCase();
+        const circle = (work.circle || '').toLowerCase();
+        const rj = (work.rj_code || '').toLowerCase();
+        return {
+            circle,
+            cvText: cv.join(SEP),
+            genreText: genres.join(SEP),
+            allText: [title, circle, rj, ...cv, ...genres].join(SEP),
+            cvSet: new Set(cv),
+            genreSet: new Set(genres),
+            rawGenreSet: new Set(work.genres || []),
+            scope: { dl: work.dl_count || 0, price: work.price || 1, rate: work.rate_average || 0, fav: work.wishlist_count || 0 },
+        };
+    }
+
+    function splitPrefix(text) {
+        for (const prefix of ['cv:', 'circle:', 'tag:']) {
+            if (text.startsWith(prefix)) return [prefix, text.slice(prefix.length).trim()];
+        }
+        return [null, text];
+    }
+
+    // Same rules as the search box always had: substring, optionally scoped by prefix
+    function matchesText(entry, prefix, value) {
+        if (prefix === 'cv:') return entry.cvSet.size > 0 && entry.cvText.includes(value);
+        if (prefix === 'circle:') return entry.circle.includes(value);
+        if (prefix === 'tag:') return entry.genreSet.size > 0 && entry.genreText.includes(value);
+        return entry.allText.includes(value);
+    }
+
+    // Include/exclude chips: exact match; un-prefixed chips are case-sensitive genres
+    function compileTag(tag) {
+        const [prefix, value] = splitPrefix(tag.toLowerCase());
+        if (prefix === 'cv:') return entry => entry.cvSet.has(value);
+        if (prefix === 'circle:') return entry => entry.circle !== '' && entry.circle === value;
+        if (prefix === 'tag:') return entry => entry.genreSet.has(value);
+        return entry => entry.rawGenreSet.has(tag);
+    }
+
+    class SearchIndex {
+        constructor() {
+            this.reset();
+        }
+
+        reset() {
+            this.entries = [];
+            this.formula = null;
+            this.compiled = null;
+        }
+
+        add(works) {
+            for (const work of works) this.entries.push(makeEntry(work));
+        }
+
+        compile(formula) {
+            if (formula !== this.formula) {
+                this.compiled = math.compile(formula);
+                this.formula = formula;
+            }
+            return this.compiled;
+        }
+
+        // Returns { order: [entry index...], scores: [...] | null, error: string | null }
+        run({ query = '', include = [], exclude = [], formula = '' }) {
+            const [prefix, value] = splitPrefix(query.toLowerCase());
+            const useText = value !== '' || prefix !== null;
+            const includes = include.map(compileTag);
+            const excludes = exclude.map(compileTag);
+
+            const order = [];
+            this.entries.forEach((entry, i) => {
+                if (useText && !matchesText(entry, prefix, value)) return;
+                if (!includes.every(test => test(entry))) return;
+                if (excludes.some(test => test(entry))) return;
+                order.push(i);
+            });
+
+            try {
+                const compiled = this.compile(formula);
+                const score = new Map(order.map(i => [i, compiled.evaluate(this.entries[i].scope)]));
+                order.sort((a, b) => score.get(b) - score.get(a));
+                return { order, scores: order.map(i => score.get(i)), error: null };
+            } catch (e) {
+                return { order, scores: null, error: String(e) };
+            }
+        }
+    }
+
+    root.SearchIndex = SearchIndex;
+})(self);
@@ -0,0 +1,11 @@
+// Runs SearchIndex off the UI thread. Messages: {type: 'reset'}, {type: 'add', works},
+// {type: 'query', id, query, include, exclude, formula} -> {id, order, scores, error}.
+importScripts('https://cdnjs.cloudflare.com/ajax/libs/mathjs/11.8.0/math.js', '/static/js/search_index.js');
+
+const index = new SearchIndex();
+
+self.onmessage = ({ data }) => {
+    if (data.type === 'reset') index.reset();
+    else if (data.type === 'add') index.add(data.works);
+    else if (data.type === 'query') self.postMessage({ id: data.id, ...index.run(data) });
+};
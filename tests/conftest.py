@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from dlsite_app.config import settings
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the app at a fresh SQLite file (and image root) under ``tmp_path``."""
+    monkeypatch.setattr(settings, "db_path", tmp_path / "asmr.db")
+    monkeypatch.setattr(settings, "image_root", tmp_path / "images")
+    return settings.db_path
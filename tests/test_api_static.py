@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from dlsite_app import create_app
+from dlsite_app.routes import api
+from dlsite_app.services import static_catalog
+from dlsite_app.services.documents import ALL_FIELDS
+
+
+WORKS = [
+    {field: None for field in ALL_FIELDS} | {"rj_code": f"RJ0100000{i}", "title": f"作品{i}", "dl_count": i}
+    for i in (3, 1, 2, 5, 4)
+]
+
+
+@pytest.fixture
+def client(temp_db, tmp_path, monkeypatch):
+    works_path = tmp_path / "works.json"
+    works_path.write_text(json.dumps(WORKS, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(api, "STATIC_WORKS_PATH", works_path)
+    monkeypatch.setattr(static_catalog, "CATALOG_DIR", tmp_path / "catalog")
+    api.response_cache.clear()
+    return create_app().test_client()
+
+
+def test_static_pages_follow_the_cursor_in_rj_code_order(client):
+    seen, cursor = [], None
+    while True:
+        query = {"fields": "all", "limit": 2} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/api/works", query_string=query).get_json()
+        seen += [work["rj_code"] for work in page["items"]]
+        assert all(set(work) == set(ALL_FIELDS) for work in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(work["rj_code"] for work in WORKS)
+
+
+def test_static_page_with_other_fields_is_projected(client):
+    page = client.get("/api/works", query_string={"fields": "rj_code,title", "limit": 1}).get_json()
+    assert page == {"items": [{"rj_code": "RJ01000001", "title": "作品1"}], "next_cursor": "RJ01000001"}
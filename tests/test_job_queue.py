@@ -0,0 +1,35 @@
+import os
+import time
+
+from dlsite_app.services import job_queue
+
+
+def _write(path, codes, mtime):
+    job_queue.write_code_file(path, codes)
+    os.utime(path, (mtime, mtime))
+
+
+def test_import_codes_drops_codes_removed_from_file(temp_db, tmp_path):
+    path = tmp_path / "Update_Code.txt"
+    conn = job_queue.connect()
+    try:
+        _write(path, ["RJ01000001", "RJ01000002"], time.time() - 60)
+        assert job_queue.import_codes(conn, path, "update") == 2
+
+        _write(path, ["RJ01000001"], time.time() + 60)
+        job_queue.import_codes(conn, path, "update")
+        assert job_queue.codes(conn, "update") == ["RJ01000001"]
+    finally:
+        conn.close()
+
+
+def test_import_codes_keeps_jobs_added_after_the_file_was_written(temp_db, tmp_path):
+    path = tmp_path / "Update_Code.txt"
+    conn = job_queue.connect()
+    try:
+        _write(path, ["RJ01000001"], time.time() - 60)
+        job_queue.enqueue(conn, ["RJ01000002"], "update")  # e.g. promoted by a concurrent new_sc run
+        job_queue.import_codes(conn, path, "update")
+        assert job_queue.codes(conn, "update") == ["RJ01000001", "RJ01000002"]
+    finally:
+        conn.close()
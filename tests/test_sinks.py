@@ -0,0 +1,40 @@
+import json
+import sqlite3
+
+from dlsite_app.services.sinks import make_sink
+
+
+RECORD = {
+    "rj_code": "RJ01000001",
+    "scraped_at_ts": 1700000000.0,
+    "static_scraped_at_ts": 1700000000.0,
+    "static_info": {"title": "テスト作品", "circle": "Circle", "genres": ["ASMR"], "cv": ["声優A"]},
+    "dynamic_info": {"dl_count": 10, "price": 1100, "rate_average_2dp": 4.5},
+}
+
+
+def test_db_sink_write_upserts_work_and_document(temp_db):
+    sink = make_sink("db")
+    assert sink.write(RECORD) == "db:RJ01000001"
+    assert sink.known_codes(["RJ01000001", "RJ09999999"]) == ["RJ01000001"]
+
+    conn = sqlite3.connect(temp_db)
+    try:
+        assert conn.execute("SELECT title FROM works").fetchone() == ("テスト作品",)
+        assert conn.execute("SELECT dl_count FROM stats").fetchone() == (10,)
+        doc = json.loads(conn.execute("SELECT doc FROM work_docs").fetchone()[0])
+        assert doc["rj_code"] == "RJ01000001"
+    finally:
+        conn.close()
+
+
+def test_db_sink_update_dynamic(temp_db):
+    sink = make_sink("db")
+    sink.write(RECORD)
+    assert sink.update_dynamic({"RJ01000001": {"dl_count": 20}}, 1700000100.0) == ["RJ01000001"]
+
+    conn = sqlite3.connect(temp_db)
+    try:
+        assert conn.execute("SELECT dl_count FROM stats").fetchone() == (20,)
+    finally:
+        conn.close()